@@ -1,23 +1,40 @@
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, AsyncIterator, Iterator
 import uvicorn
 from dotenv import load_dotenv
 import os
-import os
-import pickle
 import traceback
+import asyncio
+import json
+import math
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
+import numpy as np
 from langchain.llms.base import LLM
-from langchain.embeddings.base import Embeddings
+from langchain_core.outputs import GenerationChunk
 from langchain_community.vectorstores import FAISS
 from langchain.docstore.document import Document
 from langchain.chains import RetrievalQA
 from langchain.prompts import PromptTemplate
-import google.generativeai as genai
-import torch
-from transformers import AutoTokenizer, AutoModel
+from hf_embeddings import HFEmbeddingWrapper, embed_sentences
+import faiss_store
+from response_cache import ResponseCache, normalize_topic
+from query_cache import CachedQueryEmbeddings, query_embedding_cache
+from retrieval import ThresholdMMRRetriever, estimate_tokens, packed_context, retrieval_stats
+from study_bank import StudyBank
+from learning_parsers import (
+    PARSERS, PROMPTS, parse_items, parse_stats, repair_missing, arepair_missing,
+)
 from fastapi.middleware.cors import CORSMiddleware
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
 app = FastAPI(
     title="ML Learning Assistant API",
     description="API for generating flashcards, quizzes, and answering questions about Machine Learning",
@@ -54,28 +71,6 @@ class QuizOption(BaseModel):
     correct_answer: str
     explanation: str
 
-class HFEmbeddingWrapper(Embeddings):
-    def __init__(self, model_name="distilbert-base-uncased"):
-        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-        self.model = AutoModel.from_pretrained(model_name)
-
-    def embed_documents(self, texts: List[str]) -> List[List[float]]:
-        embeddings = []
-        for text in texts:
-            inputs = self.tokenizer(text, return_tensors="pt", truncation=True, padding=True, max_length=512)
-            with torch.no_grad():
-                outputs = self.model(**inputs)
-            embedding = outputs.last_hidden_state[:, 0, :].squeeze().numpy()
-            embeddings.append(embedding.tolist())
-        return embeddings
-
-    def embed_query(self, text: str) -> List[float]:
-        inputs = self.tokenizer(text, return_tensors="pt", truncation=True, padding=True, max_length=512)
-        with torch.no_grad():
-            outputs = self.model(**inputs)
-        embedding = outputs.last_hidden_state[:, 0, :].squeeze().numpy()
-        return embedding.tolist()
-
 documents = [
     "Machine learning is a branch of artificial intelligence that enables computers to learn from data and improve their performance on specific tasks without being explicitly programmed.",
     "Machine learning algorithms work by analyzing large amounts of data to identify patterns and make predictions or decisions based on those patterns.",
@@ -89,42 +84,52 @@ documents = [
     "LangChain is a framework for developing applications powered by language models, combining various tools and capabilities."
 ]
 
-embedding_model = HFEmbeddingWrapper()
-faiss_index_file = "offline_faiss_index.pkl"
+# Query embeddings go through the shared cache, so repeated questions and
+# topics skip the transformer; document embedding is passed straight through.
+embedding_model = CachedQueryEmbeddings(HFEmbeddingWrapper(
+    executor_workers=int(os.getenv("EMBEDDING_WORKERS", "1")),
+    backend=os.getenv("EMBEDDING_BACKEND", "torch"),
+))
+query_embedding_cache.max_entries = int(os.getenv("QUERY_CACHE_SIZE", "4096"))
+
+QUERY_CACHE_PATH = os.getenv("QUERY_CACHE_PATH")
+faiss_index_dir = "offline_faiss_index"
 
-def load_or_create_faiss(documents, faiss_index_file):
+def load_or_create_faiss(documents, faiss_index_dir):
     try:
-        if os.path.exists(faiss_index_file):
-            print("Loading existing FAISS index...")
-            with open(faiss_index_file, "rb") as f:
-                try:
-                    vectorstore = pickle.load(f)
-                    return vectorstore
-                except:
-                    print("Error loading existing index, creating new one...")
-                    os.remove(faiss_index_file)
-                    
-        print("Creating new FAISS index...")
-        document_objects = [Document(page_content=doc) for doc in documents]
-        vectorstore = FAISS.from_documents(document_objects, embedding_model)
-        with open(faiss_index_file, "wb") as f:
-            pickle.dump(vectorstore, f)
-        return vectorstore
+        return faiss_store.load_or_create(documents, faiss_index_dir, embedding_model)
     except Exception as e:
         print(f"Error in load_or_create_faiss: {str(e)}")
         document_objects = [Document(page_content=doc) for doc in documents]
         vectorstore = FAISS.from_documents(document_objects, embedding_model)
         return vectorstore
 
+_gemini_model = None
+_gemini_lock = threading.Lock()
+
+def get_gemini_model():
+    """Configure the Gemini SDK and create the client on first use."""
+    global _gemini_model
+    if _gemini_model is None:
+        with _gemini_lock:
+            if _gemini_model is None:
+                import google.generativeai as genai
+                genai.configure(api_key=os.getenv('GOOGLE_API_KEY'))
+                _gemini_model = genai.GenerativeModel("gemini-1.5-flash")
+    return _gemini_model
+
 class GeminiLLMWrapper(LLM, BaseModel):
     model: Any = Field(default=None)
 
     class Config:
         arbitrary_types_allowed = True
 
+    def _client(self):
+        return self.model if self.model is not None else get_gemini_model()
+
     def _call(self, prompt: str, stop: Optional[List[str]] = None) -> str:
         try:
-            response = self.model.generate_content(prompt)
+            response = self._client().generate_content(prompt)
             if hasattr(response, 'text'):
                 return response.text
             elif hasattr(response, 'parts'):
@@ -134,6 +139,31 @@ class GeminiLLMWrapper(LLM, BaseModel):
         except Exception as e:
             return f"Error generating response: {str(e)}"
 
+    async def _acall(self, prompt: str, stop: Optional[List[str]] = None, **kwargs: Any) -> str:
+        try:
+            response = await self._client().generate_content_async(prompt)
+            if hasattr(response, 'text'):
+                return response.text
+            elif hasattr(response, 'parts'):
+                return ' '.join(part.text for part in response.parts)
+            else:
+                return str(response)
+        except Exception as e:
+            return f"Error generating response: {str(e)}"
+
+    def _stream(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None,
+                **kwargs: Any) -> Iterator[GenerationChunk]:
+        for chunk in self._client().generate_content(prompt, stream=True):
+            if chunk.parts:
+                yield GenerationChunk(text=chunk.text)
+
+    async def _astream(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None,
+                       **kwargs: Any) -> AsyncIterator[GenerationChunk]:
+        response = await self._client().generate_content_async(prompt, stream=True)
+        async for chunk in response:
+            if chunk.parts:
+                yield GenerationChunk(text=chunk.text)
+
     @property
     def _identifying_params(self) -> Dict[str, Any]:
         return {"model_name": "gemini-1.5-flash"}
@@ -143,144 +173,450 @@ class GeminiLLMWrapper(LLM, BaseModel):
         return "gemini"
 
 load_dotenv()
-GOOGLE_API_KEY = os.getenv('GOOGLE_API_KEY')
-genai.configure(api_key=GOOGLE_API_KEY)
-gemini_model = genai.GenerativeModel("gemini-1.5-flash")
-llm_wrapper = GeminiLLMWrapper(model=gemini_model)
+# The Gemini client, the embedding weights and the vectorstore are all
+# created on first use; warm_up() does it up front for serving processes.
+llm_wrapper = GeminiLLMWrapper()
 vectorstore = None
+_vectorstore_lock = threading.Lock()
 
-def create_qa_chain():
+def get_vectorstore():
     global vectorstore
     if vectorstore is None:
-        vectorstore = load_or_create_faiss(documents, faiss_index_file)
-    
-    return RetrievalQA.from_chain_type(
-        llm=llm_wrapper,
-        chain_type="stuff",
-        retriever=vectorstore.as_retriever(
-            search_kwargs={"k": 3, "fetch_k": 5, "score_threshold": 0.5}
-        ),
-        return_source_documents=True,
-        chain_type_kwargs={
-            "prompt": PromptTemplate(
-                input_variables=["context", "question"],
-                template="""Use the following context to provide a comprehensive answer to the question. If the context doesn't contain enough information, you may use your general knowledge to supplement the answer, but indicate which parts are from the context and which are additional information.
+        with _vectorstore_lock:
+            if vectorstore is None:
+                vectorstore = load_or_create_faiss(documents, faiss_index_dir)
+    return vectorstore
+
+qa_prompt = PromptTemplate(
+    input_variables=["context", "question"],
+    template="""Use the following context to provide a comprehensive answer to the question. If the context doesn't contain enough information, you may use your general knowledge to supplement the answer, but indicate which parts are from the context and which are additional information.
 
 Context: {context}
 
 Question: {question}
 
 Answer (be specific and detailed):"""
+)
+
+# Flashcards and quizzes carry their full instructions in the query, so they
+# share the QA prompt for now; they are registered separately so each can
+# get its own template without touching the call sites.
+chain_prompts = {
+    "ask": qa_prompt,
+    "flashcards": qa_prompt,
+    "quiz": qa_prompt,
+}
+
+# Candidates come from the FAISS index but are scored with the sentence
+# encoder: the index's DistilBERT vectors put every chunk near 1.0, so no
+# threshold on them separates relevant from off-topic context. Candidates
+# below the threshold never reach the prompt; the rest are re-ranked by MMR
+# so the k that remain do not repeat each other. check_retrieval_threshold.py
+# checks the default against on- and off-topic queries.
+RETRIEVAL_K = int(os.getenv("RETRIEVAL_K", "3"))
+RETRIEVAL_FETCH_K = int(os.getenv("RETRIEVAL_FETCH_K", "5"))
+RETRIEVAL_SCORE_THRESHOLD = float(os.getenv("RETRIEVAL_SCORE_THRESHOLD", "0.3"))
+RETRIEVAL_MMR_LAMBDA = float(os.getenv("RETRIEVAL_MMR_LAMBDA", "0.5"))
+# Estimated tokens of retrieved context allowed into one prompt.
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+
+def create_qa_chain(prompt: PromptTemplate = qa_prompt):
+    return RetrievalQA.from_chain_type(
+        llm=llm_wrapper,
+        chain_type="stuff",
+        retriever=ThresholdMMRRetriever(
+            vectorstore=get_vectorstore(),
+            k=RETRIEVAL_K,
+            fetch_k=RETRIEVAL_FETCH_K,
+            score_threshold=RETRIEVAL_SCORE_THRESHOLD,
+            lambda_mult=RETRIEVAL_MMR_LAMBDA,
+            token_budget=CONTEXT_TOKEN_BUDGET,
+            text_embedding=embed_sentences,
+        ),
+        return_source_documents=True,
+        chain_type_kwargs={"prompt": prompt}
+    )
+
+def _context_tokens(docs: List[Document]) -> int:
+    return sum(estimate_tokens(doc.page_content) for doc in docs)
+
+class ChainRegistry:
+    """Long-lived RetrievalQA chains, one per prompt type.
+
+    The chains hold no per-call state, so a single instance of each is shared
+    by all requests; the lock only guards (re)building them.
+    """
+
+    def __init__(self, prompts: Dict[str, PromptTemplate], max_concurrency: int = 8):
+        self.prompts = prompts
+        self._chains: Dict[str, RetrievalQA] = {}
+        self._lock = threading.Lock()
+        self.max_concurrency = max_concurrency
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self.build_ms: Dict[str, float] = {}
+        self._timings: Dict[str, Dict[str, float]] = {}
+
+    def build(self):
+        with self._lock:
+            for name, prompt in self.prompts.items():
+                self._build(name, prompt)
+
+    def _build(self, name: str, prompt: PromptTemplate):
+        start = time.perf_counter()
+        self._chains[name] = create_qa_chain(prompt)
+        self.build_ms[name] = (time.perf_counter() - start) * 1000
+
+    def get(self, name: str) -> RetrievalQA:
+        chain = self._chains.get(name)
+        if chain is None:
+            with self._lock:
+                if name not in self._chains:
+                    self._build(name, self.prompts[name])
+                chain = self._chains[name]
+        return chain
+
+    def run(self, name: str, query: str) -> Dict[str, Any]:
+        start = time.perf_counter()
+        chain = self.get(name)
+        lookup_ms = (time.perf_counter() - start) * 1000
+        result = chain({"query": query})
+        run_ms = (time.perf_counter() - start) * 1000 - lookup_ms
+
+        self._record(name, lookup_ms, run_ms)
+        logger.info(
+            f"chain={name} lookup={lookup_ms:.3f}ms run={run_ms:.1f}ms "
+            f"context_tokens={_context_tokens(result.get('source_documents', []))} "
+            f"(per-request construction used to cost ~{self.build_ms.get(name, 0):.1f}ms)"
+        )
+        return result
+
+    async def arun(self, name: str, query: str) -> Dict[str, Any]:
+        start = time.perf_counter()
+        chain = self.get(name)
+        lookup_ms = (time.perf_counter() - start) * 1000
+        async with self._slots:
+            wait_ms = (time.perf_counter() - start) * 1000 - lookup_ms
+            result = await chain.ainvoke({"query": query})
+        run_ms = (time.perf_counter() - start) * 1000 - lookup_ms - wait_ms
+
+        self._record(name, lookup_ms, run_ms)
+        logger.info(
+            f"chain={name} lookup={lookup_ms:.3f}ms queued={wait_ms:.1f}ms run={run_ms:.1f}ms "
+            f"context_tokens={_context_tokens(result.get('source_documents', []))} "
+            f"(per-request construction used to cost ~{self.build_ms.get(name, 0):.1f}ms)"
+        )
+        return result
+
+    async def astream(self, name: str, query: str) -> AsyncIterator[tuple]:
+        """Run a chain with token streaming.
+
+        Yields ("sources", documents) once retrieval is done, then
+        ("token", text) for each chunk of the LLM output.
+        """
+        start = time.perf_counter()
+        chain = self.get(name)
+        lookup_ms = (time.perf_counter() - start) * 1000
+        async with self._slots:
+            wait_ms = (time.perf_counter() - start) * 1000 - lookup_ms
+            docs = await chain.retriever.ainvoke(query)
+            yield "sources", docs
+            prompt = self.prompts[name].format(
+                context="\n\n".join(doc.page_content for doc in docs), question=query
             )
-        }
+            first_token_ms = None
+            async for token in llm_wrapper.astream(prompt):
+                if first_token_ms is None:
+                    first_token_ms = (time.perf_counter() - start) * 1000
+                yield "token", token
+        total_ms = (time.perf_counter() - start) * 1000
+        self._record(name, lookup_ms, total_ms - lookup_ms - wait_ms)
+        logger.info(
+            f"chain={name} stream queued={wait_ms:.1f}ms first_token={first_token_ms or 0:.1f}ms "
+            f"total={total_ms:.1f}ms context_tokens={_context_tokens(docs)}"
+        )
+
+    def run_with_documents(self, name: str, query: str, docs: List[Document]) -> str:
+        """Run only the prompt + LLM step of a chain over caller-supplied documents."""
+        chain = self.get(name)
+        return chain.combine_documents_chain.invoke({"input_documents": docs, "question": query})["output_text"]
+
+    async def arun_with_documents(self, name: str, query: str, docs: List[Document]) -> str:
+        chain = self.get(name)
+        async with self._slots:
+            result = await chain.combine_documents_chain.ainvoke({"input_documents": docs, "question": query})
+        return result["output_text"]
+
+    def _record(self, name: str, lookup_ms: float, run_ms: float):
+        with self._lock:
+            timing = self._timings.setdefault(name, {"requests": 0, "lookup_ms": 0.0, "run_ms": 0.0})
+            timing["requests"] += 1
+            timing["lookup_ms"] += lookup_ms
+            timing["run_ms"] += run_ms
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            stats = {}
+            for name, timing in self._timings.items():
+                requests = timing["requests"]
+                stats[name] = {
+                    "requests": requests,
+                    "build_ms": round(self.build_ms.get(name, 0), 3),
+                    "avg_lookup_ms": round(timing["lookup_ms"] / requests, 3),
+                    "avg_run_ms": round(timing["run_ms"] / requests, 1),
+                    "construction_ms_saved": round(self.build_ms.get(name, 0) * requests, 1),
+                }
+            return stats
+
+chain_registry = ChainRegistry(chain_prompts, max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "8")))
+
+# Bump these whenever the flashcard/quiz prompt or parser changes so cached
+# generations from the old prompt are not served.
+FLASHCARD_PROMPT_VERSION = "2"
+QUIZ_PROMPT_VERSION = "2"
+PROMPT_VERSIONS = {"flashcards": FLASHCARD_PROMPT_VERSION, "quiz": QUIZ_PROMPT_VERSION}
+# Follow-up calls allowed to fill in items that failed to parse.
+MAX_REPAIR_ATTEMPTS = int(os.getenv("MAX_REPAIR_ATTEMPTS", "1"))
+
+response_cache = ResponseCache(
+    max_entries=int(os.getenv("RESPONSE_CACHE_SIZE", "256")),
+    ttl_seconds=float(os.getenv("RESPONSE_CACHE_TTL", "86400")),
+    similarity_threshold=float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0.95")),
+    embed_fn=lambda topic: embed_sentences([topic])[0],
+)
+
+def _format_answer(question: str, result: Dict[str, Any]) -> str:
+    answer = result.get("result", "No answer generated")
+    sources = result.get("source_documents", [])
+
+    response = f"Question: {question}\n\n"
+    response += f"Answer: {answer}\n"
+    if sources:
+        response += "\nRelevant Sources:\n"
+        for i, doc in enumerate(sources, 1):
+            response += f"{i}. {doc.page_content}\n"
+            if hasattr(doc, 'metadata') and 'score' in doc.metadata:
+                response += f"   Similarity Score: {doc.metadata['score']:.3f}\n"
+    return response
+
+# Large flashcard/quiz requests are split into shards of at most
+# FANOUT_SHARD_SIZE items. Each shard is generated concurrently over its own
+# slice of the retrieved context, then near-duplicate items (by sentence
+# embedding similarity of their questions) are dropped and the shards are
+# merged. At most LLM_MAX_CONCURRENCY shards run at once.
+FANOUT_SHARD_SIZE = int(os.getenv("FANOUT_SHARD_SIZE", "5"))
+FANOUT_DOCS_PER_SHARD = int(os.getenv("FANOUT_DOCS_PER_SHARD", "3"))
+FANOUT_DEDUP_SIMILARITY = float(os.getenv("FANOUT_DEDUP_SIMILARITY", "0.95"))
+# Shards ask for a few extra items so that deduplication still leaves enough.
+FANOUT_OVERSAMPLE = 0.2
+
+def _shard_sizes(count: int) -> List[int]:
+    total = count + math.ceil(count * FANOUT_OVERSAMPLE)
+    num_shards = math.ceil(total / FANOUT_SHARD_SIZE)
+    base, extra = divmod(total, num_shards)
+    return [base + (1 if i < extra else 0) for i in range(num_shards)]
+
+def _context_slices(docs: List[Document], num_shards: int) -> List[List[Document]]:
+    # Deal documents round-robin so every shard gets some of the most
+    # relevant context; with fewer documents than shards, all share them.
+    slices = [docs[i::num_shards] for i in range(num_shards)]
+    return [packed_context(doc_slice or docs, CONTEXT_TOKEN_BUDGET) for doc_slice in slices]
+
+def _dedupe(items: List[Dict[str, Any]], field: str) -> List[Dict[str, Any]]:
+    items = [item for item in items if item.get(field)]
+    if len(items) < 2:
+        return items
+    vectors = embed_sentences([item[field] for item in items])
+    kept = [0]
+    for i in range(1, len(items)):
+        if float(np.max(vectors[kept] @ vectors[i])) < FANOUT_DEDUP_SIMILARITY:
+            kept.append(i)
+    return [items[i] for i in kept]
+
+def _fan_out(kind: str, topic: str, count: int) -> List[Dict[str, Any]]:
+    sizes = _shard_sizes(count)
+    docs = chain_registry.get(kind).retriever.vectorstore.similarity_search(
+        topic, k=FANOUT_DOCS_PER_SHARD * len(sizes)
     )
+    slices = _context_slices(docs, len(sizes))
+    with ThreadPoolExecutor(max_workers=min(len(sizes), chain_registry.max_concurrency)) as pool:
+        outputs = list(pool.map(
+            lambda shard: chain_registry.run_with_documents(kind, PROMPTS[kind](topic, shard[0]), shard[1]),
+            zip(sizes, slices),
+        ))
+    items = [item for size, text in zip(sizes, outputs) for item in parse_items(kind, text, size)]
+    logger.info(f"{kind} fan-out: {len(sizes)} shards, {len(items)} items parsed")
+    return _dedupe(items, "question")[:count]
+
+async def _afan_out(kind: str, topic: str, count: int) -> List[Dict[str, Any]]:
+    sizes = _shard_sizes(count)
+    docs = await chain_registry.get(kind).retriever.vectorstore.asimilarity_search(
+        topic, k=FANOUT_DOCS_PER_SHARD * len(sizes)
+    )
+    slices = _context_slices(docs, len(sizes))
+    outputs = await asyncio.gather(*(
+        chain_registry.arun_with_documents(kind, PROMPTS[kind](topic, size), doc_slice)
+        for size, doc_slice in zip(sizes, slices)
+    ))
+    items = [item for size, text in zip(sizes, outputs) for item in parse_items(kind, text, size)]
+    logger.info(f"{kind} fan-out: {len(sizes)} shards, {len(items)} items parsed")
+    return (await _in_embedding_executor(_dedupe, items, "question"))[:count]
 
 def ask_question(question: str):
     try:
-        qa_chain = create_qa_chain()
-        result = qa_chain({"query": question})
-        answer = result.get("result", "No answer generated")
-        sources = result.get("source_documents", [])
-
-        response = f"Question: {question}\n\n"
-        response += f"Answer: {answer}\n"
-        if sources:
-            response += "\nRelevant Sources:\n"
-            for i, doc in enumerate(sources, 1):
-                response += f"{i}. {doc.page_content}\n"
-                if hasattr(doc, 'metadata') and 'score' in doc.metadata:
-                    response += f"   Similarity Score: {doc.metadata['score']:.3f}\n"
-        return response
+        result = chain_registry.run("ask", question)
+        return _format_answer(question, result)
     except Exception as e:
         return f"Error processing question: {str(e)}\nTrace: {traceback.format_exc()}"
 
-def generate_flashcards(topic: str, num_cards: int = 5):
-    try:
-        qa_chain = create_qa_chain()  
-        
-        flashcard_prompt = f"""Based on the available context, create {num_cards} detailed flashcards about {topic}.
-        For each flashcard:
-        1. Create a clear, specific question
-        2. Provide a comprehensive answer within 50 words
-        3. Use the following format exactly:
-        CARD #number
-        Q: (question)
-        A: (detailed answer)
-        ---
-        """
-
-        result = qa_chain({"query": flashcard_prompt})
-        cards_text = result.get("result", "")
+def _generate_items(kind: str, topic: str, count: int) -> List[Dict[str, Any]]:
+    if count > FANOUT_SHARD_SIZE:
+        items = _fan_out(kind, topic, count)
+    else:
+        result = chain_registry.run(kind, PROMPTS[kind](topic, count))
+        items = parse_items(kind, result.get("result", ""), count)
+    return repair_missing(
+        kind, topic, count, items,
+        lambda prompt: chain_registry.run(kind, prompt).get("result", ""),
+        max_attempts=MAX_REPAIR_ATTEMPTS,
+    )
 
-        flashcards = []
-        current_card = {}
+def _cached_items(kind: str, topic: str, count: int, use_cache: bool = True) -> List[Dict[str, Any]]:
+    if not use_cache:
+        return _generate_items(kind, topic, count)
 
-        for line in cards_text.split('\n'):
-            line = line.strip()
-            if line.startswith('CARD'):
-                if current_card:
-                    flashcards.append(current_card)
-                current_card = {}
-            elif line.startswith('Q:'):
-                current_card['question'] = line[2:].strip()
-            elif line.startswith('A:'):
-                current_card['answer'] = line[2:].strip()
+    cached = response_cache.get(kind, topic, count, PROMPT_VERSIONS[kind])
+    if cached is not None:
+        return cached
 
-        if current_card:
-            flashcards.append(current_card)
+    items = _generate_items(kind, topic, count)
+    # A short result would be served for the whole TTL; only cache complete ones.
+    if len(items) >= count:
+        response_cache.put(kind, topic, count, PROMPT_VERSIONS[kind], items)
+    return items
 
-        return flashcards
+def generate_flashcards(topic: str, num_cards: int = 5, use_cache: bool = True):
+    try:
+        return _cached_items("flashcards", topic, num_cards, use_cache)
     except Exception as e:
         print(f"Error generating flashcards: {str(e)}")
         return []
 
-def generate_quiz(topic: str, num_questions: int = 5):
+def generate_quiz(topic: str, num_questions: int = 5, use_cache: bool = True):
     try:
-        qa_chain = create_qa_chain()  
-        
-        quiz_prompt = f"""Create a {num_questions}-question multiple-choice quiz about {topic} using the following format:
-
-        QUESTION #number
-        Q: (detailed question)
-        Options:
-        A) (option 1)
-        B) (option 2)
-        C) (option 3)
-        D) (option 4)
-        Correct Answer: (letter)
-        Explanation: (why this is the correct answer)
-        ---
-
-        Make each question test understanding of {topic} concepts.
-        Ensure only one answer is correct.
-        Include brief explanations for the correct answers.
-        """
+        return _cached_items("quiz", topic, num_questions, use_cache)
+    except Exception as e:
+        print(f"Error generating quiz: {str(e)}")
+        return []
 
-        result = qa_chain({"query": quiz_prompt})
-        quiz_text = result.get("result", "")
-
-        quiz = []
-        current_question = {}
-
-        for line in quiz_text.split('\n'):
-            line = line.strip()
-            if line.startswith('QUESTION'):
-                if current_question:
-                    quiz.append(current_question)
-                current_question = {'options': []}
-            elif line.startswith('Q:'):
-                current_question['question'] = line[2:].strip()
-            elif line.startswith(('A)', 'B)', 'C)', 'D)')):
-                current_question['options'].append(line)
-            elif line.startswith('Correct Answer:'):
-                current_question['correct_answer'] = line.replace('Correct Answer:', '').strip()
-            elif line.startswith('Explanation:'):
-                current_question['explanation'] = line.replace('Explanation:', '').strip()
-
-        if current_question:
-            quiz.append(current_question)
+# Async variants used by the API handlers. The Gemini call goes through the
+# async client, query embedding runs on the embedding model's own executor
+# and the registry caps how many chains run at once, so a slow generation
+# never blocks the event loop.
 
-        return quiz
+async def _in_embedding_executor(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(embedding_model.executor, fn, *args)
+
+async def _arun_text(kind: str, prompt: str) -> str:
+    return (await chain_registry.arun(kind, prompt)).get("result", "")
+
+async def _agenerate_items(kind: str, topic: str, count: int) -> List[Dict[str, Any]]:
+    if count > FANOUT_SHARD_SIZE:
+        items = await _afan_out(kind, topic, count)
+    else:
+        items = parse_items(kind, await _arun_text(kind, PROMPTS[kind](topic, count)), count)
+    return await arepair_missing(
+        kind, topic, count, items, lambda prompt: _arun_text(kind, prompt), max_attempts=MAX_REPAIR_ATTEMPTS
+    )
+
+# Pre-generated material (see study_bank.py) is served first. Entries older
+# than STUDY_BANK_MAX_AGE_HOURS are still served, and regenerated in the
+# background for the next request.
+_study_bank = None
+_study_bank_lock = threading.Lock()
+
+def get_study_bank() -> StudyBank:
+    """Open (and create, if missing) the study bank on first use."""
+    global _study_bank
+    if _study_bank is None:
+        with _study_bank_lock:
+            if _study_bank is None:
+                _study_bank = StudyBank(os.getenv("STUDY_BANK_PATH", "study_bank.sqlite3"))
+    return _study_bank
+
+STUDY_BANK_MAX_AGE = float(os.getenv("STUDY_BANK_MAX_AGE_HOURS", "168")) * 3600
+bank_counters = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0}
+_bank_refreshing = set()
+_background_tasks = set()
+
+async def _refresh_bank_entry(kind: str, topic: str, count: int):
+    key = (kind, normalize_topic(topic))
+    try:
+        items = await _agenerate_items(kind, topic, count)
+        if len(items) >= count:
+            await asyncio.to_thread(lambda: get_study_bank().put(kind, topic, PROMPT_VERSIONS[kind], items))
+            bank_counters["refreshes"] += 1
+    except Exception as e:
+        logger.warning(f"Refreshing bank entry {key} failed: {e}")
+    finally:
+        _bank_refreshing.discard(key)
+
+async def _bank_lookup(kind: str, topic: str, count: int) -> Optional[List[Dict[str, Any]]]:
+    # The first call opens the bank, so it runs on the worker thread too.
+    entry = await asyncio.to_thread(lambda: get_study_bank().get(kind, topic, count, PROMPT_VERSIONS[kind]))
+    if entry is None:
+        bank_counters["misses"] += 1
+        return None
+
+    if entry["age"] <= STUDY_BANK_MAX_AGE:
+        bank_counters["hits"] += 1
+    else:
+        bank_counters["stale_hits"] += 1
+        key = (kind, normalize_topic(topic))
+        if key not in _bank_refreshing:
+            _bank_refreshing.add(key)
+            task = asyncio.create_task(_refresh_bank_entry(kind, topic, entry["count"]))
+            _background_tasks.add(task)
+            task.add_done_callback(_background_tasks.discard)
+    return entry["items"]
+
+async def aask_question(question: str):
+    try:
+        result = await chain_registry.arun("ask", question)
+        return _format_answer(question, result)
+    except Exception as e:
+        return f"Error processing question: {str(e)}\nTrace: {traceback.format_exc()}"
+
+async def _acached_lookup(kind: str, topic: str, count: int) -> Optional[List[Dict[str, Any]]]:
+    """Items for the request from the study bank or the response cache, if either has them."""
+    banked = await _bank_lookup(kind, topic, count)
+    if banked is not None:
+        return banked
+    return await _in_embedding_executor(response_cache.get, kind, topic, count, PROMPT_VERSIONS[kind])
+
+async def _acache_items(kind: str, topic: str, count: int, items: List[Dict[str, Any]]):
+    # A short result would be served for the whole TTL; only cache complete ones.
+    if len(items) >= count:
+        await _in_embedding_executor(response_cache.put, kind, topic, count, PROMPT_VERSIONS[kind], items)
+
+async def _acached_items(kind: str, topic: str, count: int) -> List[Dict[str, Any]]:
+    cached = await _acached_lookup(kind, topic, count)
+    if cached is not None:
+        return cached
+
+    items = await _agenerate_items(kind, topic, count)
+    await _acache_items(kind, topic, count, items)
+    return items
+
+async def agenerate_flashcards(topic: str, num_cards: int = 5):
+    try:
+        return await _acached_items("flashcards", topic, num_cards)
+    except Exception as e:
+        print(f"Error generating flashcards: {str(e)}")
+        return []
+
+async def agenerate_quiz(topic: str, num_questions: int = 5):
+    try:
+        return await _acached_items("quiz", topic, num_questions)
     except Exception as e:
         print(f"Error generating quiz: {str(e)}")
         return []
@@ -292,10 +628,21 @@ async def root():
         "current_time": datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
     }
 
+@app.get("/stats")
+async def stats():
+    return {
+        "chains": chain_registry.stats(),
+        "response_cache": response_cache.stats(),
+        "query_embedding_cache": query_embedding_cache.stats(),
+        "retrieval": retrieval_stats.stats(),
+        "parsing": parse_stats.stats(),
+        "study_bank": {**bank_counters, "refreshing": len(_bank_refreshing)},
+    }
+
 @app.post("/ask", response_model=Dict[str, str])
 async def ask_question_endpoint(request: QuestionRequest):
     try:
-        response = ask_question(request.question)
+        response = await aask_question(request.question)
         return {"response": response}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -303,7 +650,7 @@ async def ask_question_endpoint(request: QuestionRequest):
 @app.post("/flashcards", response_model=List[Flashcard])
 async def create_flashcards(request: FlashcardRequest):
     try:
-        flashcards = generate_flashcards(request.topic, request.num_cards)
+        flashcards = await agenerate_flashcards(request.topic, request.num_cards)
         return flashcards
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -311,15 +658,83 @@ async def create_flashcards(request: FlashcardRequest):
 @app.post("/quiz", response_model=List[QuizOption])
 async def create_quiz(request: QuizRequest):
     try:
-        quiz = generate_quiz(request.topic, request.num_questions)
+        quiz = await agenerate_quiz(request.topic, request.num_questions)
         return quiz
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def _event_stream(events: AsyncIterator[str]) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+async def _stream_items(kind: str, topic: str, count: int, event: str) -> AsyncIterator[str]:
+    try:
+        cached = await _acached_lookup(kind, topic, count)
+        if cached is not None:
+            for item in cached:
+                yield _sse(event, item)
+            yield _sse("done", {"count": len(cached), "cached": True})
+            return
+
+        parser = PARSERS[kind]()
+        items = []
+        async for event_type, payload in chain_registry.astream(kind, PROMPTS[kind](topic, count)):
+            if event_type == "token":
+                for item in parser.feed(payload):
+                    items.append(item)
+                    yield _sse(event, item)
+        for item in parser.close():
+            items.append(item)
+            yield _sse(event, item)
+        parse_stats.record_parse(kind, parser, count, len(items))
+
+        streamed = len(items)
+        items = await arepair_missing(
+            kind, topic, count, items, lambda prompt: _arun_text(kind, prompt), max_attempts=MAX_REPAIR_ATTEMPTS
+        )
+        for item in items[streamed:]:
+            yield _sse(event, item)
+
+        await _acache_items(kind, topic, count, items)
+        yield _sse("done", {"count": len(items), "cached": False})
+    except Exception as e:
+        yield _sse("error", {"detail": str(e)})
+
+@app.post("/ask/stream")
+async def ask_question_stream(request: QuestionRequest):
+    async def events():
+        try:
+            context_tokens = 0
+            async for event_type, payload in chain_registry.astream("ask", request.question):
+                if event_type == "sources":
+                    context_tokens = _context_tokens(payload)
+                    yield _sse("sources", [doc.page_content for doc in payload])
+                else:
+                    yield _sse("token", {"text": payload})
+            yield _sse("done", {"context_tokens": context_tokens})
+        except Exception as e:
+            yield _sse("error", {"detail": str(e)})
+
+    return _event_stream(events())
+
+@app.post("/flashcards/stream")
+async def create_flashcards_stream(request: FlashcardRequest):
+    return _event_stream(_stream_items("flashcards", request.topic, request.num_cards, "card"))
+
+@app.post("/quiz/stream")
+async def create_quiz_stream(request: QuizRequest):
+    return _event_stream(_stream_items("quiz", request.topic, request.num_questions, "question"))
+
 @app.options("/flashcards")
 async def create_flashcards(request: FlashcardRequest):
     try:
-        flashcards = generate_flashcards(request.topic, request.num_cards)
+        flashcards = await agenerate_flashcards(request.topic, request.num_cards)
         return flashcards
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -327,19 +742,51 @@ async def create_flashcards(request: FlashcardRequest):
 @app.options("/quiz")
 async def create_quiz(request: QuizRequest):
     try:
-        quiz = generate_quiz(request.topic, request.num_questions)
+        quiz = await agenerate_quiz(request.topic, request.num_questions)
         return quiz
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def warm_up() -> Dict[str, float]:
+    """Load everything that is otherwise created on first request.
+
+    Returns the time spent on each step in milliseconds.
+    """
+    timings = {}
+    steps = (
+        ("embedding_model", lambda: embedding_model.embedding.embed_query("warm up")),
+        ("sentence_encoder", lambda: embed_sentences(["warm up"])),
+        ("vectorstore", get_vectorstore),
+        ("chains", chain_registry.build),
+        ("gemini_client", get_gemini_model),
+        ("study_bank", get_study_bank),
+    )
+    for name, step in steps:
+        start = time.perf_counter()
+        step()
+        timings[name] = round((time.perf_counter() - start) * 1000, 1)
+    return timings
+
 @app.on_event("startup")
 async def startup_event():
-    global vectorstore
+    if QUERY_CACHE_PATH:
+        # Vectors saved under another model or EMBEDDING_BACKEND are left out.
+        loaded = query_embedding_cache.load(QUERY_CACHE_PATH, {embedding_model.cache_name})
+        logger.info(f"Loaded {loaded} cached query embeddings for {embedding_model.cache_name}")
+    if os.getenv("WARMUP_ON_STARTUP", "1") != "1":
+        logger.info("Skipping warm-up; models load on first request")
+        return
     try:
-        vectorstore = load_or_create_faiss(documents, faiss_index_file)
+        logger.info(f"Warm-up finished: {warm_up()}")
+        logger.info(f"QA chains built: {chain_registry.build_ms}")
     except Exception as e:
-        print(f"Error initializing FAISS index: {str(e)}")
-        raise e
+        logger.error(f"Warm-up failed: {e}")
+        raise
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if QUERY_CACHE_PATH:
+        query_embedding_cache.save(QUERY_CACHE_PATH)
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
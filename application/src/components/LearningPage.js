@@ -3,6 +3,50 @@ import "./LearningPage.css";
 
 const MAX_VISIBLE_CARDS = 4;
 
+const streamEvents = async (url, body, endpoint, onEvent, signal) => {
+  const response = await fetch(url, {
+    method: 'POST',
+    signal,
+    headers: {
+      'Content-Type': 'application/json',
+    },
+    credentials: 'include',
+    mode: 'cors',
+    body: JSON.stringify(body)
+  });
+  if (!response.ok) {
+    const errorData = await response.json().catch(() => null);
+    throw new Error(
+      `${endpoint} failed: ${response.status} ${response.statusText}` +
+      (errorData ? ` - ${errorData.detail}` : '')
+    );
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done || (signal && signal.aborted)) break;
+    buffer += decoder.decode(value, { stream: true });
+    const messages = buffer.split('\n\n');
+    buffer = messages.pop();
+    for (const message of messages) {
+      let event = 'message';
+      let data = '';
+      for (const line of message.split('\n')) {
+        if (line.startsWith('event: ')) event = line.slice(7);
+        else if (line.startsWith('data: ')) data += line.slice(6);
+      }
+      const payload = data ? JSON.parse(data) : null;
+      if (event === 'error') {
+        throw new Error(`${endpoint} failed: ${payload && payload.detail}`);
+      }
+      onEvent(event, payload);
+    }
+  }
+};
+
 const LearningPage = () => {
   const [flashcardsData, setFlashcardsData] = useState([]);
   const [quizData, setQuizData] = useState([]);
@@ -14,83 +58,73 @@ const LearningPage = () => {
   const [showExplanation, setShowExplanation] = useState([]);
 
   useEffect(() => {
+    const formatQuestion = (question, id) => ({
+      id,
+      question: question.question,
+      options: question.options || [],
+      correctAnswer: (question.options || []).findIndex(option =>
+        option.startsWith(`${question.correct_answer})`)
+      ),
+      explanation: question.explanation
+    });
+
+    const controller = new AbortController();
+
     const fetchData = async () => {
       try {
         setLoading(true);
-        
-        const [flashcardsResponse, quizResponse] = await Promise.all([
-          fetch('http://localhost:8000/flashcards', {
-            method: 'POST',
-            headers: {
-              'Content-Type': 'application/json',
+        setError(null);
+        setFlashcardsData([]);
+        setFlippedStates([]);
+        setQuizData([]);
+        setSelectedOptions([]);
+        setShowExplanation([]);
+
+        // Cards and questions are rendered as soon as each one has been
+        // parsed on the server instead of after the whole generation.
+        await Promise.all([
+          streamEvents(
+            'http://localhost:8000/flashcards/stream',
+            { topic: "Machine Learning", num_cards: 6 },
+            'Flashcards',
+            (event, data) => {
+              if (event !== 'card') return;
+              setFlashcardsData(prev => [
+                ...prev,
+                { id: prev.length, question: data.question, answer: data.answer }
+              ]);
+              setFlippedStates(prev => [...prev, false]);
+              setLoading(false);
             },
-            credentials: 'include',
-            mode: 'cors', 
-            body: JSON.stringify({
-              topic: "Machine Learning",
-              num_cards: 6
-            })
-          }),
-          fetch('http://localhost:8000/quiz', {
-            method: 'POST',
-            headers: {
-              'Content-Type': 'application/json',
+            controller.signal
+          ),
+          streamEvents(
+            'http://localhost:8000/quiz/stream',
+            { topic: "Machine Learning", num_questions: 2 },
+            'Quiz',
+            (event, data) => {
+              if (event !== 'question') return;
+              setQuizData(prev => [...prev, formatQuestion(data, prev.length)]);
+              setSelectedOptions(prev => [...prev, null]);
+              setShowExplanation(prev => [...prev, false]);
+              setLoading(false);
             },
-            credentials: 'include',
-            mode: 'cors', 
-            body: JSON.stringify({
-              topic: "Machine Learning",
-              num_questions: 2
-            })
-          })
-        ]);    
-        const checkResponse = async (response, endpoint) => {
-          if (!response.ok) {
-            const errorData = await response.json().catch(() => null);
-            throw new Error(
-              `${endpoint} failed: ${response.status} ${response.statusText}` +
-              (errorData ? ` - ${errorData.detail}` : '')
-            );
-          }
-          return response.json();
-        };
-
-        const [flashcardsResult, quizResult] = await Promise.all([
-          checkResponse(flashcardsResponse, 'Flashcards'),
-          checkResponse(quizResponse, 'Quiz')
+            controller.signal
+          )
         ]);
-
-        const formattedFlashcards = flashcardsResult.map(card => ({
-          id: card.id,
-          question: card.question,
-          answer: card.answer
-        }));
-
-        const formattedQuiz = quizResult.map(question => ({
-          id: question.id,
-          question: question.question,
-          options: question.options,
-          correctAnswer: question.options.findIndex(option => 
-            option.startsWith(`${question.correct_answer})`)
-          ),
-          explanation: question.explanation
-        }));
-
-        setFlashcardsData(formattedFlashcards);
-        setQuizData(formattedQuiz);
-        setFlippedStates(Array(formattedFlashcards.length).fill(false));
-        setSelectedOptions(Array(formattedQuiz.length).fill(null));
-        setShowExplanation(Array(formattedQuiz.length).fill(false));
-        
       } catch (error) {
+        if (controller.signal.aborted) return;
         console.error('Error fetching data:', error);
         setError(error.message);
       } finally {
-        setLoading(false);
+        if (!controller.signal.aborted) setLoading(false);
       }
     };
 
     fetchData();
+    // Abort the streams on unmount (and on StrictMode's dev remount) so a
+    // stale pair never appends to the new run's lists.
+    return () => controller.abort();
   }, []);
   const visibleCardIndexes = [];
   for (let i = 0; i < MAX_VISIBLE_CARDS; i++) {
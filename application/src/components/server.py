@@ -3,7 +3,6 @@ from fastapi import FastAPI, Body, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import os
-import faiss
 import numpy as np
 from sentence_transformers import SentenceTransformer
 from langchain_community.vectorstores import FAISS
@@ -17,6 +16,11 @@ from langchain.text_splitter import RecursiveCharacterTextSplitter
 from neo4j import GraphDatabase
 from dotenv import load_dotenv
 import logging
+import sys
+
+# The index selection rules live in faiss_index.py at the repository root.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+from faiss_index import build_index as build_skill_index
 
 load_dotenv()
 
@@ -49,18 +53,9 @@ class SWOTRequest(BaseModel):
     cv_path: str
     industry_skills: str
 
-def initialize_faiss(index_dim):
-    index = faiss.IndexFlatIP(index_dim)
-    return index
-
 def vectorize_data(data, model):
     return model.encode(data, convert_to_tensor=False)
 
-def populate_faiss_index(index, vectors):
-    if len(vectors) == 0:
-        return
-    index.add(np.array(vectors, dtype=np.float32))
-
 def retrieve_skill_requirements():
     query = """
     MATCH (s:Skill)-[:REQUIRED_FOR]->(j:Job)
@@ -147,9 +142,9 @@ def perform_swot_analysis(user_profile, industry_skills):
 industry_skills = retrieve_skill_requirements()
 if len(industry_skills) > 0:
     skill_embeddings = vectorize_data(industry_skills, sentence_model)
-    skill_dim = skill_embeddings[0].shape[0]
-    faiss_index = initialize_faiss(skill_dim)
-    populate_faiss_index(faiss_index, skill_embeddings)
+    # Flat, HNSW or IVF-PQ by number of skills, with search parameters for
+    # FAISS_RECALL_TARGET; the same rules as the learning-corpus stores.
+    faiss_index = build_skill_index(np.asarray(skill_embeddings, dtype=np.float32), metric="ip")
 else:
     skill_embeddings = []
     faiss_index = None
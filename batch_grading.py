@@ -0,0 +1,218 @@
+import argparse
+import json
+import os
+import time
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from dotenv import load_dotenv
+from rate_limit import RateLimiter
+
+# Grades uploaded interview transcripts offline. Input is JSONL, one
+# transcript per line:
+#   {"id": "...", "answers": [{"question": "...", "answer": "...", "criteria": "..."}]}
+# Answers are packed several to a prompt, packs are graded on a thread pool
+# under a shared rate limit, and every graded answer is appended to the
+# output JSONL straight away; rerunning with the same output skips them.
+# A pack whose LLM call fails is left out of the output, so a rerun grades
+# it again.
+
+Answer = Tuple[str, Dict]  # (key, {"transcript_id", "index", "question", "response", "criteria"})
+
+def iter_answers(paths: Iterable[str], shard_index: int = 0, num_shards: int = 1,
+                 counters: Optional[Dict[str, int]] = None) -> Iterator[Answer]:
+    """Stream answers from transcript files, keeping only this shard's transcripts.
+
+    Malformed transcript lines and answers without a question are skipped and
+    counted in `counters["invalid"]`.
+    """
+    counters = counters if counters is not None else {}
+    counters.setdefault("invalid", 0)
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    transcript = json.loads(line)
+                    answers = transcript.get("answers", [])
+                    if not isinstance(answers, list):
+                        raise ValueError("'answers' is not a list")
+                except (ValueError, AttributeError) as e:
+                    counters["invalid"] += 1
+                    print(f"{path}:{line_number}: skipping malformed transcript ({e})")
+                    continue
+                transcript_id = str(transcript.get("id", f"{os.path.basename(path)}:{line_number}"))
+                if zlib.crc32(transcript_id.encode("utf-8")) % num_shards != shard_index:
+                    continue
+                for index, answer in enumerate(answers):
+                    if not isinstance(answer, dict) or not answer.get("question"):
+                        counters["invalid"] += 1
+                        print(f"{path}:{line_number}: skipping answer {index} without a question")
+                        continue
+                    yield f"{transcript_id}:{index}", {
+                        "transcript_id": transcript_id,
+                        "index": index,
+                        "question": answer["question"],
+                        "response": answer.get("answer", ""),
+                        "criteria": answer.get("criteria", "Technical accuracy, depth and clarity"),
+                    }
+
+def pack_answers(answers: Iterable[Answer], max_per_prompt: int = 5, max_chars: int = 8000) -> Iterator[List[Answer]]:
+    """Group answers into packs of at most `max_per_prompt` answers and roughly `max_chars` of text."""
+    pack, size = [], 0
+    for key, item in answers:
+        chars = len(item["question"]) + len(item["response"]) + len(item["criteria"])
+        if pack and (len(pack) >= max_per_prompt or size + chars > max_chars):
+            yield pack
+            pack, size = [], 0
+        pack.append((key, item))
+        size += chars
+    if pack:
+        yield pack
+
+def load_done(output_path: str) -> Set[str]:
+    """Keys already graded by an earlier, possibly interrupted, run."""
+    done = set()
+    if os.path.exists(output_path):
+        with open(output_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    done.add(json.loads(line)["key"])
+                except (ValueError, KeyError):
+                    continue  # a line cut short by a crash; that answer is graded again
+    return done
+
+class RateLimitedLLM:
+    """Waits for the shared limiter before every LLM call."""
+
+    def __init__(self, llm, limiter: RateLimiter):
+        self._llm = llm
+        self._limiter = limiter
+
+    def invoke(self, prompt, **kwargs):
+        self._limiter.acquire()
+        return self._llm.invoke(prompt, **kwargs)
+
+def grade_transcripts(scorer, paths: List[str], output_path: str, max_workers: int = 4,
+                      max_per_prompt: int = 5, max_chars: int = 8000,
+                      shard_index: int = 0, num_shards: int = 1) -> Dict[str, float]:
+    """Grade every answer not yet in `output_path` and append the results to it.
+
+    At most `2 * max_workers` packs are in flight, so the input is read only as
+    fast as it is graded.
+    """
+    done = load_done(output_path)
+    summary = {"skipped": len(done), "graded": 0, "failed": 0, "invalid": 0, "packs": 0}
+    pending_answers = (
+        (key, item) for key, item in iter_answers(paths, shard_index, num_shards, summary) if key not in done
+    )
+    packs = pack_answers(pending_answers, max_per_prompt, max_chars)
+    if os.path.exists(output_path) and os.path.getsize(output_path):
+        with open(output_path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            partial = f.read(1) != b"\n"
+        if partial:
+            # Start on a fresh line after a crash cut the last row short.
+            with open(output_path, "a", encoding="utf-8") as f:
+                f.write("\n")
+
+    def grade(pack: List[Answer]) -> List[Dict]:
+        evaluations = scorer.evaluate_responses_batch([item for _, item in pack])
+        return [
+            {"key": key, "transcript_id": item["transcript_id"], "index": item["index"],
+             "question": item["question"], "evaluation": evaluation}
+            for (key, item), evaluation in zip(pack, evaluations)
+        ]
+
+    start = time.perf_counter()
+    with open(output_path, "a", encoding="utf-8") as out, ThreadPoolExecutor(max_workers=max_workers) as pool:
+        in_flight = {}
+
+        def submit_next() -> bool:
+            pack = next(packs, None)
+            if pack is None:
+                return False
+            in_flight[pool.submit(grade, pack)] = pack
+            return True
+
+        while len(in_flight) < 2 * max_workers and submit_next():
+            pass
+        while in_flight:
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                pack = in_flight.pop(future)
+                summary["packs"] += 1
+                try:
+                    rows = future.result()
+                except Exception as e:
+                    summary["failed"] += len(pack)
+                    print(f"pack of {len(pack)} starting at {pack[0][0]} failed, rerun to retry: {e}")
+                else:
+                    out.write("".join(json.dumps(row) + "\n" for row in rows))
+                    out.flush()
+                    summary["graded"] += len(rows)
+                submit_next()
+            elapsed = time.perf_counter() - start
+            print(f"{summary['graded']} answers graded in {elapsed:.1f}s "
+                  f"({summary['graded'] / elapsed * 60:.1f} answers/min)")
+
+    elapsed = time.perf_counter() - start
+    summary["seconds"] = round(elapsed, 1)
+    summary["answers_per_minute"] = round(summary["graded"] / elapsed * 60, 1) if elapsed > 0 else 0.0
+    return summary
+
+def summarize(output_path: str) -> Dict[str, Dict]:
+    """Average score and answer count per transcript from a results file."""
+    scores: Dict[str, List[float]] = {}
+    seen: Set[str] = set()
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except ValueError:
+                continue
+            if row["key"] in seen:
+                continue
+            seen.add(row["key"])
+            scores.setdefault(row["transcript_id"], []).append(row["evaluation"]["score"])
+    return {
+        transcript_id: {"average_score": round(sum(s) / len(s), 2), "num_answers": len(s)}
+        for transcript_id, s in scores.items()
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Grade interview transcripts (JSONL) in batches.")
+    parser.add_argument("inputs", nargs="+", help="transcript JSONL files")
+    parser.add_argument("--output", default="graded_answers.jsonl", help="results JSONL; reruns resume from it")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--per-minute", type=float, default=30, help="max LLM calls started per minute")
+    parser.add_argument("--answers-per-prompt", type=int, default=5)
+    parser.add_argument("--max-chars", type=int, default=8000, help="rough text budget per packed prompt")
+    parser.add_argument("--shard-index", type=int, default=0)
+    parser.add_argument("--num-shards", type=int, default=1, help="split transcripts across several runs")
+    args = parser.parse_args()
+
+    load_dotenv()
+    # Imported here so packing and resuming work without the LLM stack.
+    from employability_score import LLMEmployabilityScorer
+
+    scorer = LLMEmployabilityScorer()
+    scorer.llm = RateLimitedLLM(scorer.llm, RateLimiter(args.per_minute))
+    summary = grade_transcripts(
+        scorer, args.inputs, args.output,
+        max_workers=args.workers,
+        max_per_prompt=args.answers_per_prompt,
+        max_chars=args.max_chars,
+        shard_index=args.shard_index,
+        num_shards=args.num_shards,
+    )
+    print(f"Done: {summary}")
+
+    summary_path = f"{os.path.splitext(args.output)[0]}.summary.json"
+    with open(summary_path, "w", encoding="utf-8") as f:
+        json.dump(summarize(args.output), f, indent=2)
+    print(f"Per-transcript scores saved to {summary_path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import argparse
+import time
+import numpy as np
+from hf_embeddings import HFEmbeddingWrapper
+
+def per_text_loop(wrapper: HFEmbeddingWrapper, texts):
+    """The original embed_documents: one forward pass per text, batch size 1."""
+    import torch
+    embeddings = []
+    for text in texts:
+        inputs = wrapper.tokenizer(text, return_tensors="pt", truncation=True, padding=True, max_length=512)
+        with torch.no_grad():
+            outputs = wrapper.model(**inputs)
+        embedding = outputs.last_hidden_state[:, 0, :].squeeze().numpy()
+        embeddings.append(embedding.tolist())
+    return embeddings
+
+def make_corpus(n: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    words = ("machine learning model data neural network training feature gradient "
+             "supervised deep layer vector similarity search index embedding").split()
+    return [" ".join(rng.choice(words, size=int(rng.integers(8, 200)))) for _ in range(n)]
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-text and batched document embedding.")
+    parser.add_argument("--num-texts", type=int, default=512)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[8, 32, 64])
+    args = parser.parse_args()
+
+    texts = make_corpus(args.num_texts)
+    wrapper = HFEmbeddingWrapper()
+    wrapper.embed_batch(texts[:4])  # warm up
+
+    baseline, loop_secs = timed(per_text_loop, wrapper, texts)
+    baseline = np.asarray(baseline, dtype=np.float32)
+    print(f"per-text loop:   {loop_secs:8.2f}s  {len(texts) / loop_secs:8.1f} texts/s")
+
+    for batch_size in args.batch_sizes:
+        batched, secs = timed(wrapper.embed_batch, texts, batch_size)
+        max_err = float(np.abs(batched - baseline).max())
+        print(f"batched (bs={batch_size:3d}): {secs:8.2f}s  {len(texts) / secs:8.1f} texts/s  "
+              f"speedup x{loop_secs / secs:5.2f}  max abs diff {max_err:.2e}")
+
+if __name__ == "__main__":
+    main()
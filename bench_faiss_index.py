@@ -0,0 +1,66 @@
+import argparse
+import os
+import time
+import numpy as np
+import faiss
+import faiss_index
+import faiss_store
+
+def make_vectors(n: int, dim: int, seed: int = 0) -> np.ndarray:
+    # Clustered data behaves more like text embeddings than uniform noise,
+    # which would make every approximate index look bad.
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(1, n // 100), dim)).astype(np.float32)
+    labels = rng.integers(0, len(centers), size=n)
+    return centers[labels] + 0.3 * rng.normal(size=(n, dim)).astype(np.float32)
+
+def recall_at_k(found: np.ndarray, exact: np.ndarray) -> float:
+    k = exact.shape[1]
+    return float(np.mean([len(set(f) & set(e)) / k for f, e in zip(found, exact)]))
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare approximate FAISS indexes with exact search.")
+    parser.add_argument("--num-vectors", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--index-dir", help="benchmark the vectors of a saved store instead of synthetic ones")
+    parser.add_argument("--num-queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--kinds", nargs="+", default=["flat", "hnsw", "ivfpq"],
+                        choices=[k for k in faiss_index.KINDS if k != "auto"])
+    parser.add_argument("--recall-targets", type=float, nargs="+", default=[0.9, 0.95, 0.99])
+    args = parser.parse_args()
+
+    if args.index_dir:
+        vectors = faiss_index.reconstruct_all(faiss.read_index(os.path.join(args.index_dir, faiss_store.INDEX_FILE)))
+    else:
+        vectors = make_vectors(args.num_vectors, args.dim)
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.choice(len(vectors), args.num_queries, replace=False)]
+    queries = queries + 0.05 * rng.normal(size=queries.shape).astype(np.float32)
+
+    exact_index = faiss.IndexFlatL2(vectors.shape[1])
+    exact_index.add(vectors)
+    _, exact = exact_index.search(queries, args.k)
+    print(f"{len(vectors)} vectors of dim {vectors.shape[1]}; "
+          f"auto choice at recall 0.95: {faiss_index.choose_index(len(vectors), vectors.shape[1], 0.95)}")
+    print(f"{'index':<24} {'target':>6} {'build s':>8} {'MB':>8} {'ms/query':>9} {'recall@' + str(args.k):>10}")
+
+    for kind in args.kinds:
+        for target in args.recall_targets if kind != "flat" else [1.0]:
+            start = time.perf_counter()
+            index = faiss_index.build_index(vectors, kind=kind, recall_target=target)
+            build_secs = time.perf_counter() - start
+            size_mb = faiss.serialize_index(index).nbytes / 1e6
+
+            start = time.perf_counter()
+            for query in queries:
+                index.search(query[None, :], args.k)
+            ms_per_query = (time.perf_counter() - start) * 1000 / len(queries)
+            _, found = index.search(queries, args.k)
+
+            spec = faiss_index.choose_index(len(vectors), vectors.shape[1], target, kind)
+            print(f"{spec:<24} {target:>6.2f} {build_secs:>8.1f} {size_mb:>8.1f} {ms_per_query:>9.3f} "
+                  f"{recall_at_k(found, exact):>10.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import requests
+from ollama_client import OllamaClient
+
+class StubOllamaHandler(BaseHTTPRequestHandler):
+    """Answers /api/generate like Ollama, after a fixed delay."""
+
+    protocol_version = "HTTP/1.1"  # keep-alive, as Ollama does
+    delay = 0.05
+    connections = 0
+    _lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        with StubOllamaHandler._lock:
+            StubOllamaHandler.connections += 1
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        time.sleep(self.delay)
+        payload = json.dumps({"model": body["model"], "response": f"echo: {body['prompt'][-40:]}",
+                              "done": True}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+def start_stub(delay: float) -> ThreadingHTTPServer:
+    StubOllamaHandler.delay = delay
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubOllamaHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def per_call_client(base_url: str, prompt: str) -> str:
+    """The old behaviour: a fresh client, and so a fresh connection, per message."""
+    with requests.Session() as session:
+        response = session.post(f"{base_url}/api/generate",
+                                json={"model": "llama2", "prompt": prompt, "stream": False}, timeout=120)
+        return response.json()["response"]
+
+def run(label: str, fn, num_requests: int, concurrency: int):
+    latencies = []
+
+    def timed(i):
+        start = time.perf_counter()
+        fn(f"question {i}")
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    connections_before = StubOllamaHandler.connections
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(timed, range(num_requests)))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<18} {num_requests / elapsed:8.1f} req/s  p50 {np.percentile(latencies, 50):7.1f}ms  "
+          f"p95 {np.percentile(latencies, 95):7.1f}ms  connections {StubOllamaHandler.connections - connections_before}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-message and pooled Ollama clients.")
+    parser.add_argument("--url", help="benchmark a real Ollama server instead of the local stub")
+    parser.add_argument("--delay", type=float, default=0.05, help="stub generation time in seconds")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent callers")
+    parser.add_argument("--max-concurrency", type=int, default=None,
+                        help="client-side limit for the pooled client (default: --concurrency)")
+    args = parser.parse_args()
+
+    server = None
+    if args.url:
+        base_url = args.url
+    else:
+        server = start_stub(args.delay)
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    client = OllamaClient(base_url=base_url, max_concurrency=args.max_concurrency or args.concurrency)
+    run("per-call client", lambda prompt: per_call_client(base_url, prompt), args.requests, args.concurrency)
+    run("pooled client", client.generate, args.requests, args.concurrency)
+    print(f"pooled client stats: {client.stats()}")
+    client.close()
+    if server is not None:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,15 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 import itertools
-import numpy as np
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
 import faiss
+import numpy as np
 from sentence_transformers import SentenceTransformer
-from langchain_community.llms import Ollama
+from ollama_client import client_from_env
+from query_cache import normalize_query, query_embedding_cache
+from faiss_index import build_index, read_index
 
 app = Flask(__name__)
 CORS(app) 
@@ -27,6 +32,7 @@ def decompose_query(query: str):
 
 class SemanticSearch:
     def __init__(self, model_name: str = "sentence-transformers/all-MiniLM-L6-v2"):
+        self.model_name = model_name
         self.encoder = SentenceTransformer(model_name)
         self.index = None
         self.documents = []
@@ -34,38 +40,104 @@ class SemanticSearch:
     def build_index(self, docs: list):
         self.documents = docs
         embeddings = self.encoder.encode(docs, convert_to_numpy=True)
-        dimension = embeddings.shape[1]
-        self.index = faiss.IndexFlatL2(dimension)
-        self.index.add(embeddings)
-
-    def search(self, query: str, top_k: int = 3):
+        self.index = build_index(embeddings, metric="l2")
+
+    def save(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        faiss.write_index(self.index, os.path.join(path, "index.faiss"))
+        with open(os.path.join(path, "documents.json"), "w", encoding="utf-8") as f:
+            json.dump({"model_name": self.model_name, "documents": self.documents}, f)
+
+    def load(self, path: str, docs: list, mmap: bool = True) -> bool:
+        """Load a saved index if it was built from `docs` with this encoder.
+
+        With mmap=True the index is mapped read-only, so every worker of a
+        pre-forked server shares the same pages.
+        """
+        try:
+            with open(os.path.join(path, "documents.json"), encoding="utf-8") as f:
+                saved = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return False
+        if saved.get("model_name") != self.model_name or saved.get("documents") != docs:
+            return False
+        self.documents = docs
+        self.index = read_index(os.path.join(path, "index.faiss"), mmap)
+        return True
+
+    def load_or_build(self, path: str, docs: list):
+        if not self.load(path, docs):
+            self.build_index(docs)
+            self.save(path)
+
+    def _embed_queries(self, queries: list) -> np.ndarray:
+        # Cached vectors are reused; the distinct misses go through one
+        # encode call.
+        vectors = [query_embedding_cache.get(self.model_name, q) for q in queries]
+        missing = list(dict.fromkeys(normalize_query(q) for q, v in zip(queries, vectors) if v is None))
+        if missing:
+            encoded = self.encoder.encode(missing, convert_to_numpy=True)
+            fresh = {text: query_embedding_cache.put(self.model_name, text, vector)
+                     for text, vector in zip(missing, encoded)}
+            vectors = [v if v is not None else fresh[normalize_query(q)] for q, v in zip(queries, vectors)]
+        return np.vstack(vectors).astype(np.float32)
+
+    def search_batch(self, queries: list, top_k: int = 3):
+        """Search several queries with one encode and one index.search call.
+
+        Returns one list of (document, distance) pairs per query.
+        """
         if self.index is None:
             raise ValueError("Search index is not built. Call build_index first.")
+        if not queries:
+            return []
+
+        distances, indices = self.index.search(self._embed_queries(queries), top_k)
+        return [
+            [(self.documents[idx], dist) for dist, idx in zip(dist_list, idx_list) if idx != -1]
+            for dist_list, idx_list in zip(distances, indices)
+        ]
 
-        query_embedding = self.encoder.encode([query], convert_to_numpy=True)
-        distances, indices = self.index.search(query_embedding, top_k)
-        results = []
-        for dist_list, idx_list in zip(distances, indices):
-            for dist, idx in zip(dist_list, idx_list):
-                results.append((self.documents[idx], dist))
-        return results
+    def search(self, query: str, top_k: int = 3):
+        return self.search_batch([query], top_k=top_k)[0]
+
+def _context(results) -> str:
+    return "\n".join("\n".join(doc for doc, dist in step_results) for step_results in results)
 
 def rag_pipeline(query: str, semantic_search_instance: SemanticSearch, generation_fn, top_k: int = 3):
     steps = decompose_query(query)
-    all_relevant_docs = []
+    results = semantic_search_instance.search_batch(steps, top_k=top_k)
+    return generation_fn(query, _context(results))
+
+def rag_pipeline_batch(queries: list, semantic_search_instance: SemanticSearch, generation_fn, top_k: int = 3):
+    """rag_pipeline for many queries, with the sub-queries of all of them retrieved in one pass."""
+    steps_per_query = [decompose_query(query) for query in queries]
+    results = semantic_search_instance.search_batch(
+        [step for steps in steps_per_query for step in steps], top_k=top_k
+    )
+    contexts = []
+    offset = 0
+    for steps in steps_per_query:
+        contexts.append(_context(results[offset:offset + len(steps)]))
+        offset += len(steps)
+    # The LLM client bounds how many of these actually run at once.
+    with ThreadPoolExecutor(max_workers=min(len(queries), 16) or 1) as pool:
+        return list(pool.map(generation_fn, queries, contexts))
+
+# One client for the whole process, reusing its HTTP connections.
+llm_client = client_from_env()
+
+GENERATION_PROMPT = """Answer the question using the context below. If the context does not help, say so and answer from general knowledge.
+
+Context:
+{context}
 
-    for step in steps:
-        results = semantic_search_instance.search(step, top_k=top_k)
-        doc_texts = [doc for doc, dist in results]
-        all_relevant_docs.append("\n".join(doc_texts))
+Question: {query}
 
-    combined_context = "\n".join(all_relevant_docs)
-    return generation_fn(query, combined_context)
+Answer:"""
 
-def dummy_llm_generation(query: str, context: str):
-    llama2 = Ollama(model="llama2")
-    response = llama2(query)
-    return response
+def llm_generation(query: str, context: str):
+    return llm_client.generate(GENERATION_PROMPT.format(context=context, query=query))
 
 documents = [
     "Data Scientist position, requires Python, machine learning, and data visualization skills.",
@@ -74,8 +146,11 @@ documents = [
     "Full-stack Developer position, needs experience with Node.js and cloud deployment."
 ]
 
+# Built once and saved; later starts (and every worker forked from a
+# preloaded server, see serve_chatbot.py) map the saved index instead.
+CHATBOT_INDEX_DIR = os.getenv("CHATBOT_INDEX_DIR", "chatbot_faiss_index")
 sem_search = SemanticSearch()
-sem_search.build_index(documents)
+sem_search.load_or_build(CHATBOT_INDEX_DIR, documents)
 
 @app.route('/chat', methods=['POST'])
 def chat():
@@ -89,7 +164,7 @@ def chat():
         response = rag_pipeline(
             query=user_message,
             semantic_search_instance=sem_search,
-            generation_fn=dummy_llm_generation,
+            generation_fn=llm_generation,
             top_k=2
         )
 
@@ -98,5 +173,29 @@ def chat():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/chat/batch', methods=['POST'])
+def chat_batch():
+    try:
+        data = request.json or {}
+        messages = data.get('messages')
+
+        if not isinstance(messages, list) or not messages:
+            return jsonify({'error': 'No messages provided'}), 400
+        if not all(isinstance(m, str) and m.strip() for m in messages):
+            return jsonify({'error': 'Every message must be a non-empty string'}), 400
+
+        responses = rag_pipeline_batch(
+            queries=messages,
+            semantic_search_instance=sem_search,
+            generation_fn=llm_generation,
+            top_k=2
+        )
+
+        return jsonify({'responses': responses})
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 if __name__ == '__main__':
-    app.run(debug=True, port=5000)
\ No newline at end of file
+    # Development server only; use serve_chatbot.py in production.
+    app.run(debug=os.getenv("FLASK_DEBUG", "1") == "1", port=5000, threaded=True)
\ No newline at end of file
@@ -0,0 +1,87 @@
+import argparse
+import multiprocessing
+import resource
+import sys
+import time
+import numpy as np
+from bench_embeddings import make_corpus
+from hf_embeddings import BACKENDS, HFEmbeddingWrapper
+
+def _run_backend(backend: str, corpus, queries):
+    """Embed queries (and, for the torch reference, the corpus) with one backend in a fresh process.
+
+    Running each backend in its own process keeps their resident memory
+    separate, so the reported peak RSS belongs to that backend alone.
+    """
+    wrapper = HFEmbeddingWrapper(backend=backend).load()
+    doc_vectors = wrapper.embed_batch(corpus) if corpus else None
+    wrapper.embed_query(queries[0])  # warm up
+    latencies = []
+    query_vectors = []
+    for query in queries:
+        start = time.perf_counter()
+        query_vectors.append(wrapper.embed_query(query))
+        latencies.append((time.perf_counter() - start) * 1000)
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 ** 2 if sys.platform == "darwin" else 1024)
+    return doc_vectors, np.asarray(query_vectors, dtype=np.float32), np.asarray(latencies), rss_mb
+
+def _top_k(doc_vectors: np.ndarray, query_vectors: np.ndarray, k: int) -> np.ndarray:
+    # Squared L2, as used by the IndexFlatL2 behind the FAISS vectorstores.
+    distances = (
+        (query_vectors ** 2).sum(1)[:, None] - 2 * query_vectors @ doc_vectors.T + (doc_vectors ** 2).sum(1)[None, :]
+    )
+    return np.argsort(distances, axis=1)[:, :k]
+
+def _cosine(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return (a * b).sum(1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check that an embedding backend retrieves the same neighbours as the torch backend."
+    )
+    parser.add_argument("--backends", nargs="+", default=["torch-int8", "onnx", "onnx-int8"],
+                        choices=[b for b in BACKENDS if b != "torch"])
+    parser.add_argument("--num-docs", type=int, default=500)
+    parser.add_argument("--num-queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--min-recall", type=float, default=0.9,
+                        help="exit non-zero if any backend's recall@k falls below this")
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.num_docs, seed=0)
+    queries = [" ".join(text.split()[:12]) for text in make_corpus(args.num_queries, seed=1)]
+
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(1, maxtasksperchild=1) as pool:
+        ref_docs, ref_queries, ref_latency, ref_rss = pool.apply(_run_backend, ("torch", corpus, queries))
+    reference = _top_k(ref_docs, ref_queries, args.k)
+    print(f"{'backend':<11} {'dim':>4} {'recall@' + str(args.k):>9} {'cosine':>7} "
+          f"{'p50 ms':>7} {'p95 ms':>7} {'peak RSS MB':>12}")
+    print(f"{'torch':<11} {ref_queries.shape[1]:>4} {1.0:>9.3f} {1.0:>7.4f} "
+          f"{np.percentile(ref_latency, 50):>7.2f} {np.percentile(ref_latency, 95):>7.2f} {ref_rss:>12.0f}")
+
+    failed = []
+    for backend in args.backends:
+        with ctx.Pool(1, maxtasksperchild=1) as pool:
+            _, query_vectors, latency, rss = pool.apply(_run_backend, (backend, [], queries))
+        if query_vectors.shape[1] != ref_queries.shape[1]:
+            print(f"{backend:<11} dimension {query_vectors.shape[1]} != {ref_queries.shape[1]}")
+            failed.append(backend)
+            continue
+        # Queries from the candidate backend against the torch-built index:
+        # this is what serving sees when only the query path is switched.
+        found = _top_k(ref_docs, query_vectors, args.k)
+        recall = np.mean([len(set(a) & set(b)) / args.k for a, b in zip(reference, found)])
+        cosine = _cosine(ref_queries, query_vectors).mean()
+        print(f"{backend:<11} {query_vectors.shape[1]:>4} {recall:>9.3f} {cosine:>7.4f} "
+              f"{np.percentile(latency, 50):>7.2f} {np.percentile(latency, 95):>7.2f} {rss:>12.0f}")
+        if recall < args.min_recall:
+            failed.append(backend)
+
+    if failed:
+        print(f"\nBelow recall {args.min_recall}: {', '.join(failed)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
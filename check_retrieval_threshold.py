@@ -0,0 +1,56 @@
+import argparse
+import sys
+from langchain_community.vectorstores import FAISS
+from QuestionsFlashcard_Generate import (
+    RETRIEVAL_FETCH_K, RETRIEVAL_K, RETRIEVAL_MMR_LAMBDA, RETRIEVAL_SCORE_THRESHOLD, documents, embedding_model,
+)
+from hf_embeddings import embed_sentences
+from retrieval import ThresholdMMRRetriever
+
+ON_TOPIC = [
+    "What is supervised learning?",
+    "How do neural networks process information?",
+    "Why do machine learning models need validation data?",
+    "What is FAISS used for?",
+]
+OFF_TOPIC = [
+    "What is the capital of France?",
+    "How do I bake sourdough bread?",
+    "Who won the 1998 football world cup?",
+    "What is the best time of year to plant tomatoes?",
+]
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check that the retrieval score threshold keeps on-topic chunks and drops off-topic ones."
+    )
+    parser.add_argument("--threshold", type=float, default=RETRIEVAL_SCORE_THRESHOLD)
+    args = parser.parse_args()
+
+    # The sample corpus in memory; the on-disk index is neither read nor written.
+    retriever = ThresholdMMRRetriever(
+        vectorstore=FAISS.from_texts(documents, embedding_model),
+        k=RETRIEVAL_K,
+        fetch_k=RETRIEVAL_FETCH_K,
+        score_threshold=args.threshold,
+        lambda_mult=RETRIEVAL_MMR_LAMBDA,
+        text_embedding=embed_sentences,
+    )
+    print(f"threshold {args.threshold}, fetch_k {RETRIEVAL_FETCH_K}, k {RETRIEVAL_K}")
+    failed = []
+    for expect_context, queries in ((True, ON_TOPIC), (False, OFF_TOPIC)):
+        for query in queries:
+            docs = retriever.invoke(query)
+            scores = ", ".join(f"{d.metadata['score']:.2f}" for d in docs)
+            print(f"{'on ' if expect_context else 'off'} {len(docs)} kept [{scores}] {query}")
+            if bool(docs) != expect_context:
+                failed.append(query)
+
+    if failed:
+        print(f"\n{len(failed)} queries on the wrong side of the threshold:")
+        for query in failed:
+            print(f"  {query}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+from typing import List
+
+# Topics the learning assistant studies and the roadmap skill hierarchy. Kept
+# free of heavy imports so batch jobs can read the curriculum cheaply.
+
+STUDY_TOPICS = [
+    "Machine Learning",
+    "Deep Learning",
+    "Neural Networks",
+    "Supervised Learning"
+]
+
+SKILL_HIERARCHY = {
+    "foundational": {
+        "programming": ["Python", "R", "SQL"],
+        "mathematics": ["Statistics", "Linear Algebra", "Calculus"],
+        "tools": ["Git", "Command Line"]
+    },
+    "intermediate": {
+        "data_processing": ["Pandas", "NumPy", "Data Cleaning"],
+        "visualization": ["Matplotlib", "Seaborn", "Tableau"],
+        "ml_basics": ["Scikit-learn", "Model Evaluation", "Feature Engineering"]
+    },
+    "advanced": {
+        "deep_learning": ["Neural Networks", "TensorFlow", "PyTorch"],
+        "big_data": ["Spark", "Hadoop", "Cloud Computing"],
+        "deployment": ["MLOps", "Docker", "API Development"]
+    }
+}
+
+# General topics interview questions touch on besides the roadmap skills.
+INTERVIEW_TOPICS = [
+    "Algorithms", "Data Structures", "System Design", "Debugging", "Testing",
+    "Databases", "Software Architecture", "Performance Optimization", "Security",
+    "Version Control", "Project Management", "Communication", "Teamwork",
+    "Problem Solving", "Continuous Learning",
+]
+
+def hierarchy_skills() -> List[str]:
+    return [skill for level in SKILL_HIERARCHY.values() for skills in level.values() for skill in skills]
+
+def curriculum_topics() -> List[str]:
+    """Study topics followed by every roadmap skill, without duplicates."""
+    return list(dict.fromkeys(STUDY_TOPICS + hierarchy_skills()))
+
+def skill_vocabulary() -> List[str]:
+    """Every topic the interview topic tagger can assign, without duplicates."""
+    return list(dict.fromkeys(curriculum_topics() + INTERVIEW_TOPICS))
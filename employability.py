@@ -7,8 +7,12 @@ from langchain.prompts import PromptTemplate
 from dotenv import load_dotenv
 import json
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from abc import ABC, abstractmethod
 import numpy as np
+from curriculum import skill_vocabulary
+from topic_tagger import TopicTagger
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -30,6 +34,27 @@ class Response:
     answer: str
     evaluation: Optional[Dict] = None
 
+@dataclass
+class RunningStat:
+    count: int = 0
+    total: float = 0.0
+    total_sq: float = 0.0
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.total_sq += value * value
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    @property
+    def std(self) -> float:
+        if not self.count:
+            return 0.0
+        return max(0.0, self.total_sq / self.count - self.mean ** 2) ** 0.5
+
 @dataclass
 class InterviewMemory:
     past_responses: List[Response] = field(default_factory=list)
@@ -37,6 +62,19 @@ class InterviewMemory:
     candidate_weaknesses: List[str] = field(default_factory=list)
     interaction_history: List[Dict] = field(default_factory=list)
     strategy_adjustments: List[str] = field(default_factory=list)
+    # Updated once per answer so nothing has to replay the history.
+    overall_stats: RunningStat = field(default_factory=RunningStat)
+    topic_stats: Dict[str, RunningStat] = field(default_factory=dict)
+    difficulty_stats: Dict[str, RunningStat] = field(
+        default_factory=lambda: {d.value: RunningStat() for d in QuestionDifficulty}
+    )
+
+    def record_score(self, score: float, topics: List[str], difficulty: Optional[str] = None) -> None:
+        self.overall_stats.add(score)
+        for topic in topics:
+            self.topic_stats.setdefault(topic, RunningStat()).add(score)
+        if difficulty is not None:
+            self.difficulty_stats.setdefault(difficulty, RunningStat()).add(score)
 
 class BaseLLMScorer(ABC):
     @abstractmethod
@@ -48,11 +86,19 @@ class BaseLLMScorer(ABC):
         pass
 
 class AgentLLMEmployabilityScorer(BaseLLMScorer):
-    def __init__(self, model_name: str = "gemini-1.5-pro", temperature: float = 0.2):
-        self.llm = self._initialize_llm(model_name, temperature)
+    def __init__(self, model_name: str = "gemini-1.5-pro", temperature: float = 0.2,
+                 topic_tagger: Optional[TopicTagger] = None, llm=None):
+        # `llm` lets several scorers share one client; anything with invoke() works.
+        self.llm = llm or self._initialize_llm(model_name, temperature)
+        # Candidate skills go into a per-scorer overlay, so a tagger shared
+        # between scorers is never modified.
+        self.topic_tagger = (topic_tagger or TopicTagger(skill_vocabulary())).overlay()
         self._load_prompts()
         self.memory = InterviewMemory()
         self.difficulty_weights = {"basic": 0.3, "intermediate": 0.3, "advanced": 0.4}
+        # Guards memory and weights; question generation and evaluation may
+        # run on background threads. LLM calls are made outside it.
+        self._state_lock = threading.RLock()
         self.target_score_threshold = 75
 
     def _initialize_llm(self, model_name: str, temperature: float) -> ChatGoogleGenerativeAI:
@@ -114,6 +160,10 @@ Provide your evaluation in the following JSON format EXACTLY (maintain proper JS
         )
 
     def adapt_strategy(self, response: Response) -> None:
+        with self._state_lock:
+            self._adapt_strategy(response)
+
+    def _adapt_strategy(self, response: Response) -> None:
         current_difficulty = response.question.difficulty.value
         if response.evaluation["score"] > 85:
             self.difficulty_weights[current_difficulty] -= 0.1
@@ -148,11 +198,14 @@ Provide your evaluation in the following JSON format EXACTLY (maintain proper JS
 
     def generate_questions(self, profile: Dict, num_questions: int = 10) -> List[Question]:
         try:
+            self.topic_tagger.add_topics(s for s in profile.get("skills", []) if s.strip())
+            with self._state_lock:
+                weights = json.dumps(self.difficulty_weights)
             result = self.llm.invoke(
                 self.question_prompt.format(
                     profile=json.dumps(profile),
                     num_questions=num_questions,
-                    weights=json.dumps(self.difficulty_weights),
+                    weights=weights,
                     skills=", ".join(profile.get("skills", []))
                 )
             )
@@ -170,21 +223,25 @@ Provide your evaluation in the following JSON format EXACTLY (maintain proper JS
                 ) for q in questions_data
             ]
 
-            if self.memory.past_responses:
-                performance_by_topic = self._analyze_topic_performance()
+            performance_by_topic = self._analyze_topic_performance()
+            if performance_by_topic:
                 questions = self._prioritize_questions(questions, performance_by_topic)
 
             while len(questions) < num_questions:
-                questions.extend(self._get_default_questions())
+                questions.extend(self._default_question_objects())
             return questions[:num_questions]
 
         except Exception as e:
             logger.error(f"Error generating questions: {e}")
-            return self._get_default_questions()
+            return self._default_question_objects()[:num_questions]
 
-    def evaluate_response(self, question: str, response: str, criteria: str) -> Dict:
+    def evaluate_response(self, question: str, response: str, criteria: str,
+                          difficulty: Optional[str] = None) -> Dict:
+        topics: List[str] = []
         try:
-            history_summary = self._summarize_history() if self.memory.interaction_history else "No previous interactions"
+            topics = self._extract_topics(question)
+            with self._state_lock:
+                history_summary = self._summarize_history() if self.memory.interaction_history else "No previous interactions"
             
             result = self.llm.invoke(
                 self.evaluation_prompt.format(
@@ -203,22 +260,25 @@ Provide your evaluation in the following JSON format EXACTLY (maintain proper JS
             evaluation["score"] = max(0, min(100, evaluation.get("score", 70)))
             
             # Update memory
-            self.memory.interaction_history.append({
-                "question": question,
-                "response": response,
-                "evaluation": evaluation
-            })
-            
-            if evaluation["score"] >= 80:
-                self.memory.candidate_strengths.extend(evaluation["strengths"])
-            if evaluation["score"] <= 60:
-                self.memory.candidate_weaknesses.extend(evaluation["areas_for_improvement"])
-            
-            return evaluation
+            with self._state_lock:
+                self.memory.interaction_history.append({
+                    "question": question,
+                    "response": response,
+                    "evaluation": evaluation
+                })
+
+                if evaluation["score"] >= 80:
+                    self.memory.candidate_strengths.extend(evaluation["strengths"])
+                if evaluation["score"] <= 60:
+                    self.memory.candidate_weaknesses.extend(evaluation["areas_for_improvement"])
 
         except Exception as e:
             logger.error(f"Error evaluating response: {e}")
-            return self._get_default_evaluation(response)
+            evaluation = self._get_default_evaluation(response)
+
+        with self._state_lock:
+            self.memory.record_score(evaluation["score"], topics, difficulty)
+        return evaluation
 
     def _summarize_history(self) -> str:
         return json.dumps([{
@@ -239,37 +299,27 @@ Provide your evaluation in the following JSON format EXACTLY (maintain proper JS
             return default_value
 
     def _analyze_topic_performance(self) -> Dict[str, float]:
-        topic_scores = {}
-        for interaction in self.memory.interaction_history:
-            topics = self._extract_topics(interaction["question"])
-            score = interaction["evaluation"]["score"]
-            for topic in topics:
-                if topic not in topic_scores:
-                    topic_scores[topic] = []
-                topic_scores[topic].append(score)
-        
-        return {
-            topic: np.mean(scores) for topic, scores in topic_scores.items()
-        }
+        with self._state_lock:
+            return {
+                topic: stat.mean for topic, stat in self.memory.topic_stats.items()
+            }
 
     def _extract_topics(self, question: str) -> List[str]:
-        prompt = f"Extract key technical topics from this question: {question}"
-        result = self.llm.invoke(prompt)
-        topics = result.content.split(",")
-        return [t.strip().lower() for t in topics]
+        # Tagged locally against the skill vocabulary; no LLM round trip.
+        return self.topic_tagger.tag(question)
 
     def _prioritize_questions(self, questions: List[Question], 
                             topic_performance: Dict[str, float]) -> List[Question]:
         scored_questions = []
-        for q in questions:
-            topics = self._extract_topics(q.text)
+        tagged = self.topic_tagger.tag_many([q.text for q in questions])
+        for q, topics in zip(questions, tagged):
             avg_topic_score = np.mean([
                 topic_performance.get(t, 75) for t in topics
-            ])
+            ]) if topics else 75
             priority_score = 100 - avg_topic_score
             scored_questions.append((priority_score, q))
             
-        scored_questions.sort(reverse=True)
+        scored_questions.sort(key=lambda item: item[0], reverse=True)
         return [q for _, q in scored_questions]
 
     def _get_default_questions(self) -> List[Dict]:
@@ -291,6 +341,12 @@ Provide your evaluation in the following JSON format EXACTLY (maintain proper JS
             }
         ]
 
+    def _default_question_objects(self) -> List[Question]:
+        return [
+            Question(text=q["text"], criteria=q["criteria"], difficulty=QuestionDifficulty(q["difficulty"]))
+            for q in self._get_default_questions()
+        ]
+
     def _get_default_evaluation(self, response: str) -> Dict:
         words = len(response.split())
         if words < 10:
@@ -315,13 +371,18 @@ Provide your evaluation in the following JSON format EXACTLY (maintain proper JS
         }
 
 class AgentEmployabilityInterviewer:
-    def __init__(self, scorer: AgentLLMEmployabilityScorer):
+    def __init__(self, scorer: AgentLLMEmployabilityScorer, pipelined: bool = False):
         self.scorer = scorer
         self.responses: List[Response] = []
         self.target_score = 75
         self.max_questions = 15
+        self.pipelined = pipelined
+        self.round_size = 3
 
     def conduct_interview(self, profile: Dict, num_questions: int = 10) -> Dict:
+        if self.pipelined:
+            return self._conduct_pipelined(profile)
+
         questions_asked = 0
         running_score = 0
         
@@ -341,13 +402,82 @@ class AgentEmployabilityInterviewer:
                 
                 if running_score >= self.target_score and questions_asked >= 5:
                     logger.info("Target score achieved with sufficient questions")
-                    return self._generate_final_report(
-                        [r.evaluation["score"] for r in self.responses]
-                    )
+                    return self.final_report()
                     
-        return self._generate_final_report([r.evaluation["score"] for r in self.responses])
+        return self.final_report()
+
+    def _conduct_pipelined(self, profile: Dict) -> Dict:
+        """Runs the interview with the LLM calls off the candidate's path.
+
+        The next round of questions is generated while the current one is
+        being answered, and each answer is evaluated while the candidate reads
+        and answers the next question. Evaluations are reconciled in answer
+        order, each before its adapt_strategy call, so adaptation sees the same
+        sequence as in sequential mode. A speculative round reflects the
+        adaptations made up to when it was requested, and the target-score
+        check may trail by one question when an evaluation is still running.
+        """
+        questions_asked = 0
+        pending = None
+        pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="interview")
+        requested = min(self.round_size, self.max_questions)
+        next_round = pool.submit(self.scorer.generate_questions, profile, requested)
+        try:
+            while next_round is not None:
+                questions = next_round.result()
+                remaining = self.max_questions - requested
+                next_round = None
+                if remaining > 0:
+                    next_round = pool.submit(self.scorer.generate_questions, profile,
+                                             min(self.round_size, remaining))
+                    requested += min(self.round_size, remaining)
+
+                for question in questions:
+                    if pending is not None and pending[2].done():
+                        if self._reconcile(pending):
+                            return self.final_report()
+                        pending = None
+
+                    answer = self._prompt_answer(question, questions_asked + 1)
+                    questions_asked += 1
+                    current = (question, answer, pool.submit(
+                        self.scorer.evaluate_response,
+                        question.text, answer, question.criteria, question.difficulty.value
+                    ))
+                    if pending is not None and self._reconcile(pending):
+                        # The candidate already answered this one; grade it too.
+                        self._reconcile(current)
+                        return self.final_report()
+                    pending = current
+
+            if pending is not None:
+                self._reconcile(pending)
+            return self.final_report()
+        finally:
+            # Don't wait on a speculative round nobody will ask.
+            if next_round is not None:
+                next_round.cancel()
+            pool.shutdown(wait=False)
+
+    def _reconcile(self, pending) -> bool:
+        """Applies a finished evaluation; True when the interview can stop."""
+        question, answer, future = pending
+        result = self._record_response(question, answer, future.result())
+        running_score = self._update_running_score(result)
+        self.scorer.adapt_strategy(result)
+        if running_score >= self.target_score and len(self.responses) >= 5:
+            logger.info("Target score achieved with sufficient questions")
+            return True
+        return False
 
     def _ask_question(self, question: Question, q_num: int) -> Response:
+        answer = self._prompt_answer(question, q_num)
+        evaluation = self.scorer.evaluate_response(
+            question.text, answer, question.criteria, question.difficulty.value
+        )
+        return self._record_response(question, answer, evaluation)
+
+    def _prompt_answer(self, question: Question, q_num: int) -> str:
         logger.info(f"\nQuestion {q_num} ({question.difficulty.value})")
         print(f"\nQ{q_num}: {question.text}")
         print(f"Difficulty: {question.difficulty.value}")
@@ -357,8 +487,9 @@ class AgentEmployabilityInterviewer:
         while not answer:
             print("Please provide an answer to continue.")
             answer = input("Your answer: ").strip()
-        
-        evaluation = self.scorer.evaluate_response(question.text, answer, question.criteria)
+        return answer
+
+    def _record_response(self, question: Question, answer: str, evaluation: Dict) -> Response:
         response = Response(question, answer, evaluation)
         self.responses.append(response)
         
@@ -366,8 +497,7 @@ class AgentEmployabilityInterviewer:
         return response
 
     def _update_running_score(self, response: Response) -> float:
-        scores = [r.evaluation["score"] for r in self.responses]
-        return np.mean(scores)
+        return self.scorer.memory.overall_stats.mean
 
     def _display_feedback(self, evaluation: Dict) -> None:
         print(f"\nScore: {evaluation['score']}/100")
@@ -379,8 +509,9 @@ class AgentEmployabilityInterviewer:
         for area in evaluation['areas_for_improvement'][:2]:
             print(f"- {area}")
 
-    def _generate_final_report(self, scores: List[float]) -> Dict:
-        avg_score = sum(scores) / len(scores)
+    def final_report(self) -> Dict:
+        """Report on the responses recorded so far."""
+        avg_score = self.scorer.memory.overall_stats.mean
         difficulty_scores = self._calculate_difficulty_scores()
         
         return {
@@ -402,18 +533,12 @@ class AgentEmployabilityInterviewer:
         }
 
     def _calculate_difficulty_scores(self) -> Dict:
-        difficulty_scores = {d.value: [] for d in QuestionDifficulty}
-        for response in self.responses:
-            difficulty_scores[response.question.difficulty.value].append(
-                response.evaluation["score"]
-            )
-        
         return {
             difficulty: {
-                "average_score": round(sum(scores) / len(scores), 2) if scores else 0,
-                "num_questions": len(scores)
+                "average_score": round(stat.mean, 2),
+                "num_questions": stat.count
             }
-            for difficulty, scores in difficulty_scores.items()
+            for difficulty, stat in self.scorer.memory.difficulty_stats.items()
         }
     def _get_performance_summary(self, score: float) -> str:
         if score >= 90: return "Outstanding candidate with exceptional technical skills"
@@ -426,7 +551,9 @@ def main():
     try:
         load_dotenv()
         scorer = AgentLLMEmployabilityScorer()
-        interviewer = AgentEmployabilityInterviewer(scorer)
+        interviewer = AgentEmployabilityInterviewer(
+            scorer, pipelined=os.getenv("INTERVIEW_PIPELINED", "1") == "1"
+        )
         
         profile = {
             "name": input("Enter candidate name: "),
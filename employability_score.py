@@ -39,8 +39,9 @@ class BaseLLMScorer(ABC):
         pass
 
 class LLMEmployabilityScorer(BaseLLMScorer):
-    def __init__(self, model_name: str = "gemini-1.5-pro", temperature: float = 0.2):
-        self.llm = self._initialize_llm(model_name, temperature)
+    def __init__(self, model_name: str = "gemini-1.5-pro", temperature: float = 0.2, llm=None):
+        # `llm` lets several scorers share one client; anything with invoke() works.
+        self.llm = llm or self._initialize_llm(model_name, temperature)
         self._load_prompts()
 
     def _initialize_llm(self, model_name: str, temperature: float) -> ChatGoogleGenerativeAI:
@@ -102,6 +103,26 @@ Provide your evaluation in the following JSON format EXACTLY (maintain proper JS
             input_variables=["question", "response", "criteria"]
         )
 
+        self.batch_evaluation_prompt = PromptTemplate(
+            template="""Evaluate each of these technical interview responses independently:
+{items}
+
+Provide your evaluations in the following JSON format EXACTLY (maintain proper JSON syntax),
+with one entry per response and its "id" copied from above:
+{{
+  "evaluations": [
+    {{
+      "id": <response id>,
+      "score": <number between 0-100>,
+      "feedback": "<detailed constructive feedback>",
+      "strengths": ["<strength 1>", "<strength 2>"],
+      "areas_for_improvement": ["<area 1>", "<area 2>"]
+    }}
+  ]
+}}""",
+            input_variables=["items"]
+        )
+
     def _parse_llm_response(self, response_text: str, default_value: Dict) -> Dict:
         """Safely parse LLM response with better error handling"""
         try:
@@ -146,7 +167,9 @@ Provide your evaluation in the following JSON format EXACTLY (maintain proper JS
             logger.error(f"Error generating questions: {e}")
             return self._get_default_questions()
 
-    def evaluate_response(self, question: str, response: str, criteria: str) -> Dict:
+    def evaluate_response(self, question: str, response: str, criteria: str, strict: bool = False) -> Dict:
+        """Grade one response. With `strict`, LLM and parsing failures raise
+        instead of falling back to the word-count default evaluation."""
         try:
             result = self.llm.invoke(
                 self.evaluation_prompt.format(
@@ -158,16 +181,53 @@ Provide your evaluation in the following JSON format EXACTLY (maintain proper JS
             
             evaluation = self._parse_llm_response(
                 result.content,
-                self._get_default_evaluation(response)
+                None if strict else self._get_default_evaluation(response)
             )
+            if evaluation is None:
+                raise ValueError("Evaluation reply was not valid JSON")
             
             evaluation["score"] = max(0, min(100, evaluation.get("score", 70)))
             return evaluation
 
         except Exception as e:
+            if strict:
+                raise
             logger.error(f"Error evaluating response: {e}")
             return self._get_default_evaluation(response)
 
+    def evaluate_responses_batch(self, items: List[Dict]) -> List[Dict]:
+        """Grade several {"question", "response", "criteria"} items with one LLM call.
+
+        Any item the batch reply leaves out or garbles is graded on its own
+        with a strict evaluate_response, so the result always lines up with
+        `items`. LLM failures raise rather than produce default grades, so a
+        caller can retry the batch later.
+        """
+        evaluations: Dict[int, Dict] = {}
+        result = self.llm.invoke(
+            self.batch_evaluation_prompt.format(items="\n\n".join(
+                f"Response id: {i}\nQuestion: {item['question']}\n"
+                f"Response: {item['response']}\nEvaluation Criteria: {item['criteria']}"
+                for i, item in enumerate(items)
+            ))
+        )
+        parsed = self._parse_llm_response(result.content, {"evaluations": []})
+        for evaluation in parsed.get("evaluations", []) if isinstance(parsed, dict) else []:
+            try:
+                i = int(evaluation.pop("id"))
+                evaluation["score"] = max(0, min(100, float(evaluation.get("score", 70))))
+                if 0 <= i < len(items) and {"feedback", "strengths", "areas_for_improvement"} <= evaluation.keys():
+                    evaluations[i] = evaluation
+            except (AttributeError, KeyError, TypeError, ValueError):
+                continue
+
+        if len(evaluations) < len(items):
+            logger.info(f"Batch reply covered {len(evaluations)}/{len(items)} responses; grading the rest one by one")
+        return [
+            evaluations.get(i) or self.evaluate_response(item["question"], item["response"], item["criteria"], strict=True)
+            for i, item in enumerate(items)
+        ]
+
     def _get_default_questions(self) -> List[Dict]:
         return [
             {
@@ -0,0 +1,128 @@
+import math
+import os
+import numpy as np
+import faiss
+
+# Index selection by corpus size and recall target:
+#   Flat    exact search; below FLAT_MAX_VECTORS a scan is fast enough.
+#   HNSW32  graph index; high recall without training, ~dim*4 + 256 bytes
+#           per vector. Used up to HNSW_MAX_VECTORS, or beyond that when the
+#           recall target is very high.
+#   IVF,PQ  trained coarse quantizer + product-quantized codes; a fraction
+#           of the memory for very large corpora. With a recall target of
+#           0.9 or more the full vectors are kept to re-rank (RFlat).
+# The search-time knobs (HNSW efSearch, IVF nprobe) are derived from the
+# recall target. FAISS_INDEX_KIND forces a kind; FAISS_RECALL_TARGET sets
+# the default target.
+KINDS = ("auto", "flat", "hnsw", "ivfpq")
+FLAT_MAX_VECTORS = 50_000
+HNSW_MAX_VECTORS = 1_000_000
+HNSW_M = 32
+DEFAULT_KIND = os.getenv("FAISS_INDEX_KIND", "auto")
+DEFAULT_RECALL_TARGET = float(os.getenv("FAISS_RECALL_TARGET", "0.95"))
+# FAISS warns below ~39 training points per centroid.
+MIN_TRAIN_PER_LIST = 39
+MAX_TRAIN_VECTORS = 200_000
+
+METRICS = {"l2": faiss.METRIC_L2, "ip": faiss.METRIC_INNER_PRODUCT}
+
+def _nlist(n: int) -> int:
+    # ~4*sqrt(n) lists, rounded to a power of two.
+    return 2 ** max(4, round(math.log2(4 * math.sqrt(n))))
+
+def _pq_subquantizers(dim: int) -> int:
+    # Largest divisor of dim giving sub-vectors of at least 8 dimensions.
+    return max(m for m in range(1, min(64, dim // 8) + 1) if dim % m == 0) if dim >= 8 else 1
+
+def choose_index(n: int, dim: int, recall_target: float = None, kind: str = None) -> str:
+    """Return the faiss.index_factory string for `n` vectors of `dim` dimensions."""
+    recall_target = DEFAULT_RECALL_TARGET if recall_target is None else recall_target
+    kind = kind or DEFAULT_KIND
+    if kind not in KINDS:
+        raise ValueError(f"Unknown FAISS index kind '{kind}', expected one of {KINDS}")
+    if kind == "auto":
+        if n <= FLAT_MAX_VECTORS:
+            kind = "flat"
+        elif n <= HNSW_MAX_VECTORS or recall_target >= 0.98:
+            kind = "hnsw"
+        else:
+            kind = "ivfpq"
+    if kind == "flat":
+        return "Flat"
+    if kind == "hnsw":
+        return f"HNSW{HNSW_M}"
+    spec = f"IVF{_nlist(n)},PQ{_pq_subquantizers(dim)}"
+    return f"{spec},RFlat" if recall_target >= 0.9 else spec
+
+def spec_kind(spec: str) -> str:
+    return "flat" if spec == "Flat" else "hnsw" if spec.startswith("HNSW") else "ivfpq"
+
+def index_kind(index) -> str:
+    """Coarse kind of an index: flat, hnsw or ivfpq."""
+    base = faiss.downcast_index(index.base_index) if isinstance(index, faiss.IndexRefine) else index
+    if isinstance(base, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(base, faiss.IndexIVF):
+        return "ivfpq"
+    return "flat"
+
+def configure_search(index, recall_target: float = None) -> None:
+    """Set efSearch / nprobe / re-rank factor for the recall target."""
+    recall_target = DEFAULT_RECALL_TARGET if recall_target is None else recall_target
+    params = faiss.ParameterSpace()
+    kind = index_kind(index)
+    if kind == "hnsw":
+        ef = 32 if recall_target < 0.9 else 64 if recall_target < 0.95 else 128 if recall_target < 0.99 else 256
+        params.set_index_parameter(index, "efSearch", ef)
+    elif kind == "ivfpq":
+        ivf = faiss.extract_index_ivf(index)
+        fraction = 0.01 if recall_target < 0.9 else 0.03 if recall_target < 0.95 else 0.06 if recall_target < 0.99 else 0.12
+        params.set_index_parameter(index, "nprobe", max(8, min(ivf.nlist, round(ivf.nlist * fraction))))
+        if isinstance(index, faiss.IndexRefine):
+            params.set_index_parameter(index, "k_factor_rf", 4 if recall_target < 0.99 else 8)
+
+def build_index(vectors: np.ndarray, metric: str = "l2", kind: str = None,
+                recall_target: float = None, seed: int = 0):
+    """Build, train if needed, and fill an index for `vectors` (n, dim)."""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n, dim = vectors.shape
+    spec = choose_index(n, dim, recall_target, kind)
+    if spec.startswith("IVF") and n < MIN_TRAIN_PER_LIST * _nlist(n):
+        spec = "Flat"  # too few vectors to train the coarse quantizer
+    index = faiss.index_factory(dim, spec, METRICS[metric])
+    if not index.is_trained:
+        nlist = faiss.extract_index_ivf(index).nlist
+        sample_size = min(n, max(MIN_TRAIN_PER_LIST * nlist, 256 * nlist), MAX_TRAIN_VECTORS)
+        sample = vectors[np.random.default_rng(seed).choice(n, sample_size, replace=False)]
+        index.train(sample)
+    index.add(vectors)
+    if index_kind(index) == "ivfpq":
+        # Lets reconstruct() (used by MMR and rebuilds) find vectors by position.
+        faiss.extract_index_ivf(index).make_direct_map()
+    configure_search(index, recall_target)
+    return index
+
+def supports_removal(index) -> bool:
+    # The vectorstores map docstore IDs to index positions and expect
+    # remove_ids to shift later positions down, which only the flat index
+    # does; HNSW cannot remove at all and IVF keeps the old labels.
+    return index_kind(index) == "flat"
+
+def reconstruct_all(index) -> np.ndarray:
+    if index.ntotal == 0:
+        return np.empty((0, index.d), dtype=np.float32)
+    return index.reconstruct_n(0, index.ntotal)
+
+def read_index(path: str, mmap: bool = True):
+    """Read an index, memory-mapped read-only when the index type allows it.
+
+    Mapped indexes share their pages between all processes that read the
+    same file; types that cannot be mapped are read into memory instead.
+    """
+    if mmap:
+        flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY | getattr(faiss, "IO_FLAG_MMAP_IFC", 0)
+        try:
+            return faiss.read_index(path, flags)
+        except RuntimeError:
+            pass
+    return faiss.read_index(path)
@@ -0,0 +1,330 @@
+import fcntl
+import hashlib
+import json
+import os
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+import faiss
+import numpy as np
+from langchain.docstore.document import Document
+from langchain.embeddings.base import Embeddings
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+import faiss_index
+
+# On-disk layout of a vectorstore directory:
+#   index.faiss     raw FAISS index written with faiss.write_index (mmap-able)
+#   docstore.jsonl  one {"id", "page_content", "metadata"} per line, in index order
+#   manifest.json   format version, embedding model and backend, dimension,
+#                   index kind, corpus hashes
+#
+# The index type (flat, HNSW or IVF-PQ) is picked by faiss_index from the
+# number of vectors and is rebuilt when a sync moves the corpus across a
+# size threshold.
+#
+# Documents are keyed by the sha256 of their content and tagged with the
+# names of the corpora they belong to, so a corpus can be re-synced without
+# touching documents that came from elsewhere. A text present in several
+# corpora is stored once and only deleted when the last of them drops it.
+#
+# Several processes may open the same directory at once. Writers hold an
+# exclusive lock on WRITE_LOCK_FILE for a whole sync, so their updates never
+# interleave; the three files are swapped under an exclusive READ_LOCK_FILE
+# lock, and readers hold it shared while loading, so they never pair a new
+# index with an old docstore. Both are advisory flock locks.
+FORMAT_VERSION = 1
+INDEX_FILE = "index.faiss"
+DOCSTORE_FILE = "docstore.jsonl"
+MANIFEST_FILE = "manifest.json"
+WRITE_LOCK_FILE = ".write.lock"
+READ_LOCK_FILE = ".read.lock"
+
+def document_id(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def _hash_ids(doc_ids) -> str:
+    digest = hashlib.sha256()
+    for doc_id in sorted(set(doc_ids)):
+        digest.update(doc_id.encode("ascii"))
+    return digest.hexdigest()
+
+def corpus_hash(texts: List[str]) -> str:
+    return _hash_ids(document_id(t) for t in texts)
+
+def embedding_model_name(embedding: Embeddings) -> str:
+    return getattr(embedding, "model_name", type(embedding).__name__)
+
+def embedding_backend(embedding: Embeddings) -> Optional[str]:
+    # int8 backends give vectors that differ from fp32 ones, so an index is
+    # only reused with the backend that built it.
+    return getattr(embedding, "backend", None)
+
+def read_manifest(path: str) -> Optional[Dict]:
+    try:
+        with open(os.path.join(path, MANIFEST_FILE)) as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+@contextmanager
+def _flock(path: str, lock_file: str, exclusive: bool):
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, lock_file), "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+def writer_lock(path: str):
+    """Exclusive lock held across a load, sync and save of the store at `path`."""
+    return _flock(path, WRITE_LOCK_FILE, exclusive=True)
+
+def _replace_atomically(path: str, write_fn) -> None:
+    # Workers that have the old file mmapped keep their pages; new readers
+    # see either the old or the new file, never a partial one. The temporary
+    # name is unique per call, so concurrent writers never share one.
+    tmp_path = f"{path}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+    try:
+        write_fn(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def save_vectorstore(vectorstore: FAISS, path: str, model_name: str, corpora: Dict[str, str],
+                     backend: Optional[str] = None) -> None:
+    os.makedirs(path, exist_ok=True)
+    index = vectorstore.index
+
+    def write_docstore(tmp_path):
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for i in range(index.ntotal):
+                doc_id = vectorstore.index_to_docstore_id[i]
+                doc = vectorstore.docstore.search(doc_id)
+                f.write(json.dumps({
+                    "id": doc_id,
+                    "page_content": doc.page_content,
+                    "metadata": doc.metadata,
+                }) + "\n")
+
+    def write_manifest(tmp_path):
+        with open(tmp_path, "w") as f:
+            json.dump({
+                "format_version": FORMAT_VERSION,
+                "embedding_model": model_name,
+                "embedding_backend": backend,
+                "dimension": index.d,
+                "num_vectors": index.ntotal,
+                "index_kind": faiss_index.index_kind(index),
+                "corpus_hash": _hash_ids(vectorstore.index_to_docstore_id.values()),
+                "corpora": corpora,
+                "created_at": datetime.now(timezone.utc).isoformat(),
+            }, f, indent=2)
+
+    with _flock(path, READ_LOCK_FILE, exclusive=True):
+        _replace_atomically(os.path.join(path, INDEX_FILE), lambda p: faiss.write_index(index, p))
+        _replace_atomically(os.path.join(path, DOCSTORE_FILE), write_docstore)
+        # The manifest is written last so it only ever describes complete files.
+        _replace_atomically(os.path.join(path, MANIFEST_FILE), write_manifest)
+
+def load_vectorstore(path: str, embedding: Embeddings, mmap: bool = True) -> FAISS:
+    """Load a vectorstore saved with save_vectorstore.
+
+    With mmap=True the index is mapped read-only, so several worker processes
+    share the same pages; load with mmap=False before adding or removing vectors.
+    """
+    with _flock(path, READ_LOCK_FILE, exclusive=False):
+        manifest = read_manifest(path)
+        if manifest is None or manifest.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"No compatible FAISS manifest in {path}")
+
+        index = faiss_index.read_index(os.path.join(path, INDEX_FILE), mmap)
+        if index.d != manifest["dimension"] or index.ntotal != manifest["num_vectors"]:
+            raise ValueError(f"FAISS index in {path} does not match its manifest")
+
+        docs = {}
+        index_to_docstore_id = {}
+        with open(os.path.join(path, DOCSTORE_FILE), encoding="utf-8") as f:
+            for i, line in enumerate(f):
+                record = json.loads(line)
+                docs[record["id"]] = Document(page_content=record["page_content"], metadata=record["metadata"])
+                index_to_docstore_id[i] = record["id"]
+    faiss_index.configure_search(index)
+
+    return FAISS(
+        embedding_function=embedding,
+        index=index,
+        docstore=InMemoryDocstore(docs),
+        index_to_docstore_id=index_to_docstore_id,
+    )
+
+def document_corpora(doc: Document, default: str) -> set:
+    """Corpora owning `doc`; untagged documents count as `default`."""
+    metadata = doc.metadata
+    if "corpora" in metadata:
+        return set(metadata["corpora"])
+    return {metadata.get("corpus", default)}
+
+def _set_corpora(doc: Document, owners: set) -> None:
+    doc.metadata["corpora"] = sorted(owners)
+
+def corpus_ids(vectorstore: FAISS, corpus: str) -> set:
+    """IDs of the documents owned by `corpus` (untagged documents count as any corpus)."""
+    return {
+        doc_id for doc_id in vectorstore.index_to_docstore_id.values()
+        if corpus in document_corpora(vectorstore.docstore.search(doc_id), corpus)
+    }
+
+def claim_documents(vectorstore: FAISS, doc_ids, corpus: str) -> None:
+    """Add `corpus` to the owners of documents that are already stored."""
+    for doc_id in doc_ids:
+        doc = vectorstore.docstore.search(doc_id)
+        owners = document_corpora(doc, corpus)
+        if corpus not in owners or "corpora" not in doc.metadata:
+            _set_corpora(doc, owners | {corpus})
+
+def release_documents(vectorstore: FAISS, doc_ids, corpus: str) -> Tuple[FAISS, int]:
+    """Drop `corpus` as an owner of `doc_ids`, deleting documents nobody else owns.
+
+    Returns the vectorstore, which may have been rebuilt, and how many
+    documents were deleted.
+    """
+    orphaned = []
+    for doc_id in doc_ids:
+        doc = vectorstore.docstore.search(doc_id)
+        owners = document_corpora(doc, corpus) - {corpus}
+        if owners:
+            _set_corpora(doc, owners)
+        else:
+            orphaned.append(doc_id)
+    if orphaned:
+        vectorstore = delete_documents(vectorstore, orphaned)
+    return vectorstore, len(orphaned)
+
+def corpus_digest(vectorstore: FAISS, corpus: str) -> str:
+    """The manifest hash of `corpus` as currently stored in `vectorstore`."""
+    return _hash_ids(corpus_ids(vectorstore, corpus))
+
+def build_vectorstore(docs: List[Document], ids: List[str], vectors: np.ndarray, embedding: Embeddings,
+                      kind: str = None) -> FAISS:
+    """Create a vectorstore over precomputed vectors with an index chosen by faiss_index."""
+    return FAISS(
+        embedding_function=embedding,
+        index=faiss_index.build_index(vectors, kind=kind),
+        docstore=InMemoryDocstore(dict(zip(ids, docs))),
+        index_to_docstore_id=dict(enumerate(ids)),
+    )
+
+def rebuild_vectorstore(vectorstore: FAISS, drop_ids=(), kind: str = None) -> FAISS:
+    """Rebuild the index from its stored vectors, without `drop_ids`.
+
+    Used to delete from indexes without remove_ids (HNSW) and to switch index
+    type when the corpus grows. IVF-PQ without re-ranking only stores
+    compressed vectors, so rebuilding from it is lossy.
+    """
+    drop_ids = set(drop_ids)
+    vectors = faiss_index.reconstruct_all(vectorstore.index)
+    keep = [i for i in range(vectorstore.index.ntotal) if vectorstore.index_to_docstore_id[i] not in drop_ids]
+    ids = [vectorstore.index_to_docstore_id[i] for i in keep]
+    docs = [vectorstore.docstore.search(doc_id) for doc_id in ids]
+    return build_vectorstore(docs, ids, vectors[keep], vectorstore.embedding_function, kind=kind)
+
+def delete_documents(vectorstore: FAISS, doc_ids: List[str]) -> FAISS:
+    if faiss_index.supports_removal(vectorstore.index):
+        vectorstore.delete(doc_ids)
+        return vectorstore
+    return rebuild_vectorstore(vectorstore, doc_ids)
+
+def reindex_if_needed(vectorstore: FAISS, kind: str = None) -> Tuple[FAISS, bool]:
+    index = vectorstore.index
+    wanted = faiss_index.choose_index(index.ntotal, index.d, kind=kind)
+    current = faiss_index.index_kind(index)
+    if faiss_index.spec_kind(wanted) == current:
+        return vectorstore, False
+    print(f"Rebuilding FAISS index as {wanted} for {index.ntotal} vectors (was {current})")
+    return rebuild_vectorstore(vectorstore, kind=kind), True
+
+def sync_vectorstore(vectorstore: Optional[FAISS], texts: List[str], embedding: Embeddings,
+                     corpus: str) -> Tuple[FAISS, int, int]:
+    """Bring the documents of `corpus` in line with `texts`.
+
+    Only new texts are embedded. Texts already stored for another corpus are
+    shared rather than duplicated. Documents of the corpus that are no longer
+    in `texts` are released, and deleted once no corpus owns them. Returns
+    (vectorstore, added, removed).
+    """
+    wanted = {document_id(t): t for t in texts}
+    if vectorstore is None:
+        ids = list(wanted)
+        if ids:
+            vectors = np.asarray(embedding.embed_documents([wanted[i] for i in ids]), dtype=np.float32)
+        else:
+            # An empty corpus still gets an (empty) index of the right width.
+            vectors = np.empty((0, len(embedding.embed_query("dimension probe"))), dtype=np.float32)
+        docs = [Document(page_content=wanted[i], metadata={"corpus": corpus, "corpora": [corpus]}) for i in ids]
+        return build_vectorstore(docs, ids, vectors, embedding, kind=None if ids else "flat"), len(ids), 0
+
+    all_ids = set(vectorstore.index_to_docstore_id.values())
+    owned = corpus_ids(vectorstore, corpus)
+    stale = list(owned - wanted.keys())
+    new = [doc_id for doc_id in wanted if doc_id not in all_ids]
+
+    claim_documents(vectorstore, [doc_id for doc_id in wanted if doc_id in all_ids], corpus)
+    removed = 0
+    if stale:
+        vectorstore, removed = release_documents(vectorstore, stale, corpus)
+    if new:
+        vectorstore.add_texts(
+            [wanted[i] for i in new], metadatas=[{"corpus": corpus, "corpora": [corpus]} for _ in new], ids=new
+        )
+    vectorstore, _ = reindex_if_needed(vectorstore)
+    return vectorstore, len(new), removed
+
+def load_or_create(texts: List[str], path: str, embedding: Embeddings,
+                   corpus: str = "builtin", mmap: bool = True) -> FAISS:
+    model_name = embedding_model_name(embedding)
+    backend = embedding_backend(embedding)
+    digest = corpus_hash(texts)
+
+    def check(manifest):
+        compatible = (
+            manifest is not None
+            and manifest.get("format_version") == FORMAT_VERSION
+            and manifest.get("embedding_model") == model_name
+            and manifest.get("embedding_backend") == backend
+        )
+        return compatible, compatible and manifest.get("corpora", {}).get(corpus) == digest
+
+    if check(read_manifest(path))[1]:
+        print("Loading existing FAISS index...")
+        return load_vectorstore(path, embedding, mmap=mmap)
+
+    with writer_lock(path):
+        # Another process may have synced the corpus while this one waited.
+        manifest = read_manifest(path)
+        compatible, current = check(manifest)
+        if current:
+            print("Loading existing FAISS index...")
+            return load_vectorstore(path, embedding, mmap=mmap)
+
+        if compatible:
+            print(f"Corpus '{corpus}' changed, updating FAISS index incrementally...")
+            vectorstore = load_vectorstore(path, embedding, mmap=False)
+            corpora = dict(manifest.get("corpora", {}))
+        else:
+            if manifest is not None and manifest.get("embedding_backend") != backend:
+                print(f"FAISS index in {path} was built with embedding backend "
+                      f"{manifest.get('embedding_backend')}, not {backend}; rebuilding")
+            print("Creating new FAISS index...")
+            vectorstore = None
+            corpora = {}
+
+        vectorstore, added, removed = sync_vectorstore(vectorstore, texts, embedding, corpus)
+        corpora[corpus] = digest
+        save_vectorstore(vectorstore, path, model_name, corpora, backend)
+    print(f"FAISS index synced: {added} added, {removed} removed, {vectorstore.index.ntotal} total")
+    return vectorstore
@@ -0,0 +1,186 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+import numpy as np
+from langchain.embeddings.base import Embeddings
+
+# Inference backends, all producing the same CLS vectors of size hidden_size:
+#   torch       fp32 PyTorch (reference)
+#   torch-int8  PyTorch with Linear layers dynamically quantized to int8
+#   onnx        ONNX Runtime on an fp32 export of the model
+#   onnx-int8   ONNX Runtime on a dynamically quantized export
+# ONNX exports are written once under onnx_dir; serving from an existing
+# export needs onnxruntime but not torch.
+BACKENDS = ("torch", "torch-int8", "onnx", "onnx-int8")
+
+class _TorchBackend:
+    def __init__(self, model_name: str, quantize: bool = False):
+        import torch
+        from transformers import AutoModel
+        model = AutoModel.from_pretrained(model_name)
+        model.eval()
+        if quantize:
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        self.model = model
+        self.hidden_size = model.config.hidden_size
+        self.tensor_type = "pt"
+
+    def __call__(self, inputs) -> np.ndarray:
+        import torch
+        with torch.no_grad():
+            outputs = self.model(**inputs)
+        return outputs.last_hidden_state[:, 0, :].numpy()
+
+class _OnnxBackend:
+    def __init__(self, model_name: str, onnx_dir: str, quantize: bool = False):
+        import onnxruntime as ort
+        path = _onnx_export(model_name, onnx_dir, quantize)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.hidden_size = self.session.get_outputs()[0].shape[-1]
+        self.tensor_type = "np"
+
+    def __call__(self, inputs) -> np.ndarray:
+        feed = {name: value.astype(np.int64) for name, value in inputs.items() if name in self.input_names}
+        last_hidden_state = self.session.run(None, feed)[0]
+        return last_hidden_state[:, 0, :]
+
+def _onnx_export(model_name: str, onnx_dir: str, quantize: bool) -> str:
+    base = os.path.join(onnx_dir, model_name.replace("/", "__"))
+    fp32_path = f"{base}.onnx"
+    int8_path = f"{base}.int8.onnx"
+    if not os.path.exists(fp32_path):
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+        os.makedirs(onnx_dir, exist_ok=True)
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model = AutoModel.from_pretrained(model_name)
+        model.eval()
+        sample = tokenizer(["export"], return_tensors="pt")
+        names = [n for n in ("input_ids", "attention_mask") if n in sample]
+        dynamic = {"batch": 0, "sequence": 1}
+        tmp_path = f"{fp32_path}.tmp"
+        torch.onnx.export(
+            model, tuple(sample[n] for n in names), tmp_path,
+            input_names=names, output_names=["last_hidden_state"],
+            dynamic_axes={**{n: dynamic for n in names}, "last_hidden_state": dynamic},
+            opset_version=14,
+        )
+        os.replace(tmp_path, fp32_path)
+    if not quantize:
+        return fp32_path
+    if not os.path.exists(int8_path):
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        tmp_path = f"{int8_path}.tmp"
+        quantize_dynamic(fp32_path, tmp_path, weight_type=QuantType.QInt8)
+        os.replace(tmp_path, int8_path)
+    return int8_path
+
+class HFEmbeddingWrapper(Embeddings):
+    def __init__(self, model_name="distilbert-base-uncased", batch_size: int = 32, max_length: int = 512,
+                 executor_workers: int = 1, backend: str = "torch", onnx_dir: str = "onnx_models"):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown embedding backend '{backend}', expected one of {BACKENDS}")
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.backend = backend
+        self.onnx_dir = onnx_dir
+        # Async callers run inference here rather than on the event loop or
+        # the default executor, so embedding work cannot starve other tasks.
+        self.executor = ThreadPoolExecutor(max_workers=executor_workers, thread_name_prefix="embedding")
+        # The backend libraries are imported and the weights loaded on first
+        # use, so importing a service that holds a wrapper stays cheap.
+        self._tokenizer = None
+        self._backend = None
+        self._load_lock = threading.Lock()
+
+    def load(self) -> "HFEmbeddingWrapper":
+        if self._backend is None:
+            with self._load_lock:
+                if self._backend is None:
+                    from transformers import AutoTokenizer
+                    self._tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+                    if self.backend.startswith("onnx"):
+                        self._backend = _OnnxBackend(self.model_name, self.onnx_dir,
+                                                     quantize=self.backend == "onnx-int8")
+                    else:
+                        self._backend = _TorchBackend(self.model_name, quantize=self.backend == "torch-int8")
+        return self
+
+    @property
+    def tokenizer(self):
+        return self.load()._tokenizer
+
+    @property
+    def model(self):
+        """The underlying torch model; only available on the torch backends."""
+        return getattr(self.load()._backend, "model", None)
+
+    @property
+    def dimension(self) -> int:
+        return self.load()._backend.hidden_size
+
+    def _forward(self, texts: List[str]) -> np.ndarray:
+        backend = self.load()._backend
+        inputs = self.tokenizer(texts, return_tensors=backend.tensor_type, truncation=True, padding=True,
+                                max_length=self.max_length)
+        return backend(inputs)
+
+    def embed_batch(self, texts: List[str], batch_size: int = None) -> np.ndarray:
+        """Embed texts in length-sorted batches and return a (n, dim) float32 matrix."""
+        batch_size = batch_size or self.batch_size
+        if not texts:
+            return np.empty((0, self.dimension), dtype=np.float32)
+
+        # Sorting by token length keeps similar-sized texts together, so each
+        # batch is padded only up to its own longest member.
+        lengths = [
+            len(ids) for ids in self.tokenizer(texts, truncation=True, max_length=self.max_length)["input_ids"]
+        ]
+        order = np.argsort(lengths, kind="stable")
+
+        embeddings = np.empty((len(texts), self.dimension), dtype=np.float32)
+        for start in range(0, len(texts), batch_size):
+            idx = order[start:start + batch_size]
+            embeddings[idx] = self._forward([texts[i] for i in idx])
+        return np.ascontiguousarray(embeddings)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_batch(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._forward([text])[0].astype(np.float32).tolist()
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self.embed_documents, texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self.embed_query, text)
+
+# Short texts such as cache topics, generated items and retrieval candidates
+# are compared with a sentence-embedding model. Raw DistilBERT CLS vectors are
+# too anisotropic for this: unrelated topics like "machine learning" and
+# "neural networks" score above 0.95.
+SENTENCE_EMBEDDING_MODEL = os.getenv("SENTENCE_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+_sentence_encoder = None
+_sentence_encoder_lock = threading.Lock()
+
+def get_sentence_encoder():
+    global _sentence_encoder
+    if _sentence_encoder is None:
+        with _sentence_encoder_lock:
+            if _sentence_encoder is None:
+                from sentence_transformers import SentenceTransformer
+                _sentence_encoder = SentenceTransformer(SENTENCE_EMBEDDING_MODEL)
+    return _sentence_encoder
+
+def embed_sentences(texts: List[str]) -> np.ndarray:
+    """Unit-normalized sentence embeddings, one row per text."""
+    return get_sentence_encoder().encode(
+        texts, convert_to_numpy=True, normalize_embeddings=True
+    ).astype(np.float32)
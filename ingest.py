@@ -0,0 +1,191 @@
+import argparse
+import os
+import time
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List
+from langchain.docstore.document import Document
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_community.document_loaders import PyPDFLoader, TextLoader
+from langchain_community.vectorstores import FAISS
+import faiss_store
+from hf_embeddings import HFEmbeddingWrapper
+
+# Ingestion is a chain of generators: files -> pages -> chunks -> batches.
+# Only one batch of chunks and its embeddings is held at a time, so memory
+# stays flat however many files are ingested; only the index itself grows.
+# Chunk IDs are content hashes, so chunks already in the store are skipped
+# before embedding and an interrupted run can simply be started again.
+LOADERS = {
+    ".pdf": PyPDFLoader,
+    ".txt": lambda path: TextLoader(path, encoding="utf-8"),
+    ".md": lambda path: TextLoader(path, encoding="utf-8"),
+}
+
+def iter_files(paths: Iterable[str]) -> Iterator[str]:
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                for name in sorted(names):
+                    if os.path.splitext(name)[1].lower() in LOADERS:
+                        yield os.path.join(root, name)
+        elif os.path.splitext(path)[1].lower() in LOADERS:
+            yield path
+        else:
+            print(f"Skipping unsupported file: {path}")
+
+def iter_pages(files: Iterable[str], stats: Dict[str, int]) -> Iterator[Document]:
+    for path in files:
+        loader = LOADERS[os.path.splitext(path)[1].lower()](path)
+        try:
+            for page in loader.lazy_load():
+                stats["pages"] += 1
+                yield page
+            stats["files"] += 1
+        except Exception as e:
+            stats["failed_files"] += 1
+            print(f"Error loading {path}: {e}")
+
+def iter_chunks(pages: Iterable[Document], splitter: RecursiveCharacterTextSplitter,
+                corpus: str) -> Iterator[Document]:
+    for page in pages:
+        for chunk in splitter.split_documents([page]):
+            if chunk.page_content.strip():
+                chunk.metadata = {**chunk.metadata, "corpus": corpus, "corpora": [corpus]}
+                yield chunk
+
+def batched(items: Iterable, size: int) -> Iterator[List]:
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+def _open_store(path: str, embedding: HFEmbeddingWrapper):
+    manifest = faiss_store.read_manifest(path)
+    if manifest is None:
+        return None, {}
+    if manifest.get("embedding_model") != faiss_store.embedding_model_name(embedding):
+        raise ValueError(
+            f"{path} was built with {manifest.get('embedding_model')}, not "
+            f"{faiss_store.embedding_model_name(embedding)}; ingest into another directory"
+        )
+    if manifest.get("embedding_backend") != faiss_store.embedding_backend(embedding):
+        raise ValueError(
+            f"{path} was built with embedding backend {manifest.get('embedding_backend') or 'unknown'}, not "
+            f"{faiss_store.embedding_backend(embedding)}; use that --backend or ingest into another directory"
+        )
+    return faiss_store.load_vectorstore(path, embedding, mmap=False), dict(manifest.get("corpora", {}))
+
+def ingest(paths: List[str], index_dir: str, embedding: HFEmbeddingWrapper, corpus: str = "ingested",
+           chunk_size: int = 1000, chunk_overlap: int = 200, batch_size: int = 64,
+           replace: bool = False, save_every: int = 5000, report_every: int = 10) -> Dict[str, float]:
+    """Stream `paths` into the FAISS store at `index_dir` under `corpus`.
+
+    With replace=True, chunks of the corpus that were not seen in this run
+    are removed at the end. The store is saved every `save_every` new chunks
+    and once more when done.
+    """
+    # Held for the whole run so a worker syncing its corpus at start-up, or
+    # another ingest, cannot save in between and have its changes overwritten.
+    with faiss_store.writer_lock(index_dir):
+        splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        vectorstore, corpora = _open_store(index_dir, embedding)
+        model_name = faiss_store.embedding_model_name(embedding)
+        stats = {"files": 0, "failed_files": 0, "pages": 0, "chunks": 0, "embedded": 0, "existing": 0, "removed": 0}
+        known = set(vectorstore.index_to_docstore_id.values()) if vectorstore is not None else set()
+        seen = set()
+        unsaved = 0
+        start = time.perf_counter()
+
+        def save():
+            corpora[corpus] = faiss_store.corpus_digest(vectorstore, corpus)
+            faiss_store.save_vectorstore(vectorstore, index_dir, model_name, corpora, embedding.backend)
+
+        chunks = iter_chunks(iter_pages(iter_files(paths), stats), splitter, corpus)
+        for n, batch in enumerate(batched(chunks, batch_size), 1):
+            stats["chunks"] += len(batch)
+            new, existing = {}, set()
+            for chunk in batch:
+                doc_id = faiss_store.document_id(chunk.page_content)
+                seen.add(doc_id)
+                if doc_id in known:
+                    existing.add(doc_id)
+                else:
+                    new.setdefault(doc_id, chunk)
+            stats["existing"] += len(batch) - len(new)
+            if existing:
+                # Chunks stored for another corpus become shared, so a later
+                # --replace of that corpus does not delete them from this one.
+                faiss_store.claim_documents(vectorstore, existing, corpus)
+
+            if new:
+                ids = list(new)
+                texts = [new[i].page_content for i in ids]
+                vectors = embedding.embed_batch(texts)
+                text_embeddings = list(zip(texts, vectors.tolist()))
+                metadatas = [new[i].metadata for i in ids]
+                if vectorstore is None:
+                    vectorstore = FAISS.from_embeddings(text_embeddings, embedding, metadatas=metadatas, ids=ids)
+                else:
+                    vectorstore.add_embeddings(text_embeddings, metadatas=metadatas, ids=ids)
+                known.update(ids)
+                stats["embedded"] += len(ids)
+                unsaved += len(ids)
+
+            if unsaved >= save_every:
+                save()
+                unsaved = 0
+            if n % report_every == 0:
+                elapsed = time.perf_counter() - start
+                print(f"{stats['pages']} pages, {stats['chunks']} chunks ({stats['embedded']} new) "
+                      f"in {elapsed:.1f}s: {stats['pages'] / elapsed:.1f} docs/s, "
+                      f"{stats['chunks'] / elapsed:.1f} chunks/s")
+
+        if vectorstore is None:
+            print("Nothing ingested.")
+            return stats
+
+        if replace and (stats["chunks"] == 0 or stats["failed_files"]):
+            # A file that failed to load would look like a file whose chunks
+            # should all go; leave the corpus as it is rather than wipe it.
+            print(f"Skipping --replace: {stats['failed_files']} file(s) failed to load, "
+                  f"{stats['chunks']} chunks read")
+        elif replace:
+            stale = list(faiss_store.corpus_ids(vectorstore, corpus) - seen)
+            if stale:
+                vectorstore, stats["removed"] = faiss_store.release_documents(vectorstore, stale, corpus)
+        # Chunks are appended to whatever index the store has; once the corpus
+        # crosses a size threshold the index is rebuilt as HNSW or IVF-PQ.
+        vectorstore, _ = faiss_store.reindex_if_needed(vectorstore)
+        save()
+
+        elapsed = time.perf_counter() - start
+        stats.update({
+            "seconds": round(elapsed, 2),
+            "docs_per_sec": round(stats["pages"] / elapsed, 2) if elapsed else 0.0,
+            "chunks_per_sec": round(stats["chunks"] / elapsed, 2) if elapsed else 0.0,
+            "total_vectors": vectorstore.index.ntotal,
+        })
+        return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Chunk, embed and add PDF/text files to the learning corpus.")
+    parser.add_argument("paths", nargs="+", help="files or directories (.pdf, .txt, .md)")
+    parser.add_argument("--index-dir", default="offline_faiss_index")
+    parser.add_argument("--corpus", default="ingested", help="corpus name the chunks are tagged with")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=64, help="chunks embedded per forward batch")
+    parser.add_argument("--save-every", type=int, default=5000, help="save the store after this many new chunks")
+    parser.add_argument("--replace", action="store_true",
+                        help="remove chunks of the corpus that are not in the given files")
+    parser.add_argument("--backend", default=os.getenv("EMBEDDING_BACKEND", "torch"))
+    args = parser.parse_args()
+
+    stats = ingest(
+        args.paths, args.index_dir, HFEmbeddingWrapper(backend=args.backend), corpus=args.corpus,
+        chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap, batch_size=args.batch_size,
+        replace=args.replace, save_every=args.save_every,
+    )
+    print(f"Done: {stats}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+import uvicorn
+from dotenv import load_dotenv
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from langchain_google_genai import ChatGoogleGenerativeAI
+from pydantic import BaseModel, ValidationError
+from curriculum import skill_vocabulary
+from employability import AgentEmployabilityInterviewer, AgentLLMEmployabilityScorer, Question, Response
+from rate_limit import ConcurrencyLimit
+from topic_tagger import TopicTagger
+
+# Runs many adaptive interviews at once. Every session gets its own scorer,
+# so memory and difficulty weights never leak between candidates, while the
+# Gemini client and the topic tagger's encoder and base vocabulary are shared
+# by all of them; candidate skills stay in each scorer's own tagger overlay.
+
+load_dotenv()
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+LLM_MAX_CONCURRENCY = int(os.getenv("INTERVIEW_LLM_CONCURRENCY", "16"))
+LLM_TIMEOUT = float(os.getenv("INTERVIEW_LLM_TIMEOUT", "120"))
+IDLE_TIMEOUT = float(os.getenv("INTERVIEW_IDLE_TIMEOUT", "1800"))
+MAX_SESSIONS = int(os.getenv("INTERVIEW_MAX_SESSIONS", "1000"))
+SWEEP_INTERVAL = float(os.getenv("INTERVIEW_SWEEP_INTERVAL", "60"))
+WORKER_THREADS = int(os.getenv("INTERVIEW_WORKER_THREADS", "64"))
+
+class LimitedLLM:
+    """Shares one chat model between sessions under a ConcurrencyLimit."""
+
+    def __init__(self, llm, max_concurrency: int = 16, timeout: float = 120.0):
+        self._llm = llm
+        self._limit = ConcurrencyLimit(max_concurrency, timeout, name="LLM")
+
+    def invoke(self, prompt, **kwargs):
+        return self._limit.run(self._llm.invoke, prompt, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        return self._limit.stats()
+
+_shared_lock = threading.Lock()
+_shared_llm: Optional[LimitedLLM] = None
+_shared_tagger: Optional[TopicTagger] = None
+
+def get_shared_llm() -> LimitedLLM:
+    global _shared_llm
+    if _shared_llm is None:
+        with _shared_lock:
+            if _shared_llm is None:
+                api_key = os.getenv("GOOGLE_API_KEY")
+                if not api_key:
+                    raise ValueError("GOOGLE_API_KEY environment variable not set")
+                model = ChatGoogleGenerativeAI(
+                    model=os.getenv("INTERVIEW_MODEL", "gemini-1.5-pro"),
+                    google_api_key=api_key,
+                    temperature=float(os.getenv("INTERVIEW_TEMPERATURE", "0.2")),
+                    convert_system_message_to_human=True
+                )
+                _shared_llm = LimitedLLM(model, LLM_MAX_CONCURRENCY, LLM_TIMEOUT)
+    return _shared_llm
+
+def get_shared_tagger() -> TopicTagger:
+    global _shared_tagger
+    if _shared_tagger is None:
+        with _shared_lock:
+            if _shared_tagger is None:
+                _shared_tagger = TopicTagger(skill_vocabulary())
+    return _shared_tagger
+
+@dataclass
+class InterviewSession:
+    id: str
+    profile: Dict
+    interviewer: AgentEmployabilityInterviewer
+    questions: List[Question] = field(default_factory=list)
+    current: Optional[Question] = None
+    asked: int = 0
+    requested: int = 0
+    next_round: Optional[asyncio.Future] = None
+    report: Optional[Dict] = None
+    last_active: float = field(default_factory=time.monotonic)
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+    @property
+    def scorer(self) -> AgentLLMEmployabilityScorer:
+        return self.interviewer.scorer
+
+    def close(self):
+        if self.next_round is not None:
+            self.next_round.cancel()
+            self.next_round = None
+
+class SessionStore:
+    """Live sessions, oldest activity first; idle ones are evicted."""
+
+    def __init__(self, idle_timeout: float = 1800.0, max_sessions: int = 1000):
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, InterviewSession]" = OrderedDict()
+        self._counters = {"created": 0, "finished": 0, "evicted": 0, "rejected": 0}
+
+    def create(self, profile: Dict) -> Optional[InterviewSession]:
+        if len(self._sessions) >= self.max_sessions:
+            self.evict_idle()
+        if len(self._sessions) >= self.max_sessions:
+            self._counters["rejected"] += 1
+            return None
+        scorer = AgentLLMEmployabilityScorer(topic_tagger=get_shared_tagger(), llm=get_shared_llm())
+        session = InterviewSession(uuid.uuid4().hex, profile, AgentEmployabilityInterviewer(scorer))
+        self._sessions[session.id] = session
+        self._counters["created"] += 1
+        return session
+
+    def get(self, session_id: str) -> Optional[InterviewSession]:
+        session = self._sessions.get(session_id)
+        if session is not None:
+            session.last_active = time.monotonic()
+            self._sessions.move_to_end(session_id)
+        return session
+
+    def remove(self, session_id: str) -> bool:
+        session = self._sessions.pop(session_id, None)
+        if session is not None:
+            session.close()
+        return session is not None
+
+    def evict_idle(self) -> int:
+        cutoff = time.monotonic() - self.idle_timeout
+        evicted = 0
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if session.last_active > cutoff:
+                break
+            self.remove(session.id)
+            evicted += 1
+        self._counters["evicted"] += evicted
+        return evicted
+
+    def record_finished(self):
+        self._counters["finished"] += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {**self._counters, "active": len(self._sessions)}
+
+app = FastAPI(
+    title="Employability Interview API",
+    description="Adaptive technical interviews for many candidates at once",
+    version="1.0.0"
+)
+
+sessions = SessionStore(IDLE_TIMEOUT, MAX_SESSIONS)
+executor = ThreadPoolExecutor(max_workers=WORKER_THREADS, thread_name_prefix="interview")
+
+class ProfileRequest(BaseModel):
+    name: str = ""
+    current_role: str = ""
+    experience: str = ""
+    skills: List[str] = []
+    education: str = ""
+
+class AnswerRequest(BaseModel):
+    answer: str
+
+async def _run(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+
+def _request_round(session: InterviewSession):
+    """Start generating the next round in the background, if any are left."""
+    interviewer = session.interviewer
+    remaining = interviewer.max_questions - session.requested
+    session.next_round = None
+    if remaining > 0:
+        count = min(interviewer.round_size, remaining)
+        session.requested += count
+        session.next_round = asyncio.ensure_future(_run(session.scorer.generate_questions, session.profile, count))
+
+async def _next_question(session: InterviewSession) -> Optional[Question]:
+    if not session.questions:
+        if session.next_round is None:
+            return None
+        session.questions = list(await session.next_round)
+        # Speculatively prepare the following round while this one is answered.
+        _request_round(session)
+        if not session.questions:
+            return None
+    session.current = session.questions.pop(0)
+    session.asked += 1
+    return session.current
+
+def _question_payload(session: InterviewSession) -> Dict:
+    question = session.current
+    return {
+        "number": session.asked,
+        "text": question.text,
+        "difficulty": question.difficulty.value,
+        "criteria": question.criteria,
+    }
+
+def _finish(session: InterviewSession) -> Dict:
+    session.close()
+    session.current = None
+    session.report = session.interviewer.final_report()
+    sessions.record_finished()
+    return session.report
+
+async def _start(session: InterviewSession) -> Dict:
+    async with session.lock:
+        _request_round(session)
+        if await _next_question(session) is None:
+            return {"session_id": session.id, "report": _finish(session)}
+        return {"session_id": session.id, "question": _question_payload(session)}
+
+async def _submit(session: InterviewSession, answer: str) -> Dict:
+    async with session.lock:
+        if session.report is not None or session.current is None:
+            raise HTTPException(status_code=409, detail="Interview already finished")
+        question = session.current
+        evaluation = await _run(
+            session.scorer.evaluate_response,
+            question.text, answer, question.criteria, question.difficulty.value
+        )
+        response = Response(question, answer, evaluation)
+        interviewer = session.interviewer
+        interviewer.responses.append(response)
+        session.scorer.adapt_strategy(response)
+        running_score = session.scorer.memory.overall_stats.mean
+
+        payload = {"session_id": session.id, "evaluation": evaluation, "running_score": round(running_score, 2)}
+        if running_score >= interviewer.target_score and len(interviewer.responses) >= 5:
+            payload["report"] = _finish(session)
+        elif await _next_question(session) is None:
+            payload["report"] = _finish(session)
+        else:
+            payload["question"] = _question_payload(session)
+        return payload
+
+def _get_session(session_id: str) -> InterviewSession:
+    session = sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired session")
+    return session
+
+def _create_session(profile: Dict) -> InterviewSession:
+    session = sessions.create(profile)
+    if session is None:
+        raise HTTPException(status_code=503, detail="Too many active interviews, try again later")
+    return session
+
+@app.post("/sessions")
+async def start_session(request: ProfileRequest):
+    return await _start(_create_session(request.dict()))
+
+@app.post("/sessions/{session_id}/answers")
+async def submit_answer(session_id: str, request: AnswerRequest):
+    answer = request.answer.strip()
+    if not answer:
+        raise HTTPException(status_code=400, detail="Please provide an answer to continue.")
+    return await _submit(_get_session(session_id), answer)
+
+@app.get("/sessions/{session_id}")
+async def session_status(session_id: str):
+    session = _get_session(session_id)
+    if session.report is not None:
+        return {"session_id": session.id, "report": session.report}
+    return {
+        "session_id": session.id,
+        "question": _question_payload(session) if session.current else None,
+        "answered": len(session.interviewer.responses),
+        "running_score": round(session.scorer.memory.overall_stats.mean, 2),
+    }
+
+@app.delete("/sessions/{session_id}")
+async def end_session(session_id: str):
+    if not sessions.remove(session_id):
+        raise HTTPException(status_code=404, detail="Unknown or expired session")
+    return {"session_id": session_id, "deleted": True}
+
+@app.websocket("/ws/interview")
+async def interview_socket(websocket: WebSocket):
+    """First message is the profile, then one {"answer": ...} per question."""
+    await websocket.accept()
+    try:
+        try:
+            profile = ProfileRequest(**(await websocket.receive_json())).dict()
+        except (ValidationError, TypeError, ValueError) as e:
+            await websocket.send_json({"error": f"Invalid profile: {e}"})
+            await websocket.close(code=1003)
+            return
+        session = sessions.create(profile)
+        if session is None:
+            await websocket.send_json({"error": "Too many active interviews, try again later"})
+            await websocket.close(code=1013)
+            return
+        await websocket.send_json(await _start(session))
+        while session.report is None:
+            try:
+                message = json.loads(await websocket.receive_text())
+            except ValueError:
+                message = None
+            if not isinstance(message, dict):
+                await websocket.send_json({"error": 'Expected a JSON object like {"answer": "..."}'})
+                continue
+            answer = str(message.get("answer", "")).strip()
+            if not answer:
+                await websocket.send_json({"error": "Please provide an answer to continue."})
+                continue
+            sessions.get(session.id)
+            await websocket.send_json(await _submit(session, answer))
+        await websocket.close()
+    except WebSocketDisconnect:
+        # The session stays in the store until it idles out, so the
+        # candidate can reconnect over HTTP with its id.
+        pass
+
+@app.get("/stats")
+async def stats():
+    return {
+        "sessions": sessions.stats(),
+        "llm": get_shared_llm().stats() if _shared_llm is not None else {},
+        "topic_tagger": get_shared_tagger().stats() if _shared_tagger is not None else {},
+    }
+
+async def _sweep_idle_sessions():
+    while True:
+        await asyncio.sleep(SWEEP_INTERVAL)
+        evicted = sessions.evict_idle()
+        if evicted:
+            logger.info(f"Evicted {evicted} idle interview sessions")
+
+@app.on_event("startup")
+async def startup_event():
+    get_shared_llm()
+    asyncio.create_task(_sweep_idle_sessions())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    executor.shutdown(wait=False)
+
+if __name__ == "__main__":
+    uvicorn.run(app, host="0.0.0.0", port=int(os.getenv("INTERVIEW_PORT", "8001")))
@@ -0,0 +1,322 @@
+import json
+import re
+from abc import ABC, abstractmethod
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+# Generated study material is requested as a JSON array, but models do not
+# always comply, so the parsers accept either:
+#   * JSON: a top-level array of objects, optionally wrapped in an object or
+#     a ```json fence. Objects are emitted as soon as their closing brace
+#     arrives, so streamed output is parsed incrementally.
+#   * The line format: CARD #n / Q: / A: for flashcards and QUESTION #n /
+#     Q: / A)-D) / Correct Answer: / Explanation: for quizzes, with '---'
+#     between items. Lines that start with no known prefix continue the
+#     previous field, so wrapped lines are kept instead of dropped.
+
+def flashcard_prompt(topic: str, num_cards: int) -> str:
+    return f"""Based on the available context, create {num_cards} detailed flashcards about {topic}.
+For each flashcard:
+1. Create a clear, specific question
+2. Provide a comprehensive answer within 50 words
+Respond with only a JSON array containing exactly {num_cards} objects of this shape:
+[{{"question": "<question>", "answer": "<answer>"}}]"""
+
+def quiz_prompt(topic: str, num_questions: int) -> str:
+    return f"""Create a {num_questions}-question multiple-choice quiz about {topic}.
+Make each question test understanding of {topic} concepts.
+Each question has exactly four options labelled A-D and only one correct answer.
+Include a brief explanation of why the correct answer is right.
+Respond with only a JSON array containing exactly {num_questions} objects of this shape:
+[{{"question": "<question>", "options": ["A) <option>", "B) <option>", "C) <option>", "D) <option>"], "correct_answer": "<letter>", "explanation": "<explanation>"}}]"""
+
+def _existing_questions(items: List[Dict[str, Any]]) -> str:
+    return "\n".join(f"- {item['question']}" for item in items)
+
+def repair_prompt(kind: str, topic: str, missing: int, items: List[Dict[str, Any]]) -> str:
+    prompt = PROMPTS[kind](topic, missing)
+    if items:
+        prompt += f"\nDo not repeat any of these existing questions:\n{_existing_questions(items)}"
+    return prompt
+
+class _StructuredStreamParser(ABC):
+    """Incremental parser shared by the flashcard and quiz formats.
+
+    feed() accepts arbitrary chunks of model output and returns the items
+    completed so far; close() flushes what is left at the end of the stream.
+    Items missing a required field are counted in `dropped` and not returned.
+    """
+
+    header_pattern: re.Pattern = None
+    required_fields: tuple = ()
+
+    def __init__(self):
+        self.mode: Optional[str] = None  # "json" or "lines" once detected
+        self.dropped = 0
+        self._buffer = ""
+        self._current: Dict[str, Any] = {}
+        self._field: Optional[str] = None
+        # JSON scanner state
+        self._pos = 0
+        self._starts: List[int] = []
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        self._buffer += chunk
+        if self.mode is None:
+            self.mode = self._detect_mode()
+        if self.mode == "json":
+            return self._scan_json()
+        if self.mode == "lines":
+            *lines, self._buffer = self._buffer.split("\n")
+            return self._finish([self._consume_line(line) for line in lines])
+        return []
+
+    def close(self) -> List[Dict[str, Any]]:
+        if self.mode is None:
+            self.mode = "json" if "{" in self._buffer else "lines"
+        if self.mode == "json":
+            return self._scan_json()
+        completed = self.feed("\n")
+        if self._current:
+            completed += self._finish([self._flush()])
+        return completed
+
+    def _detect_mode(self) -> Optional[str]:
+        # Whichever comes first decides: an opening brace, or a header/field
+        # line of the line format. Leading prose and fences are skipped.
+        *lines, partial = self._buffer.split("\n")
+        for line in lines:
+            if "{" in line:
+                return "json"
+            cleaned = self._clean(line.strip())
+            if self.header_pattern.match(cleaned) or re.match(r"^Q\d*\s*[:.]", cleaned):
+                return "lines"
+        return "json" if "{" in partial else None
+
+    def _finish(self, items: List[Optional[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        completed = []
+        for item in items:
+            if not item:
+                continue
+            if all(item.get(f) for f in self.required_fields):
+                completed.append(item)
+            else:
+                self.dropped += 1
+        return completed
+
+    # -- JSON ---------------------------------------------------------------
+
+    def _scan_json(self) -> List[Dict[str, Any]]:
+        items = []
+        buffer = self._buffer
+        for i in range(self._pos, len(buffer)):
+            char = buffer[i]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                self._starts.append(i)
+            elif char == "}" and self._starts:
+                start = self._starts.pop()
+                try:
+                    obj = json.loads(buffer[start:i + 1])
+                except json.JSONDecodeError:
+                    continue
+                # Wrapper objects ({"cards": [...]}) have no item fields and
+                # are skipped; the items inside were emitted already.
+                if isinstance(obj, dict) and "question" in obj:
+                    items.append(self._normalize(obj))
+        self._pos = len(buffer)
+        return self._finish(items)
+
+    def _normalize(self, obj: Dict[str, Any]) -> Dict[str, Any]:
+        return {k: str(v).strip() for k, v in obj.items() if v is not None}
+
+    # -- line format ----------------------------------------------------------
+
+    @staticmethod
+    def _clean(line: str) -> str:
+        return line.replace("**", "").lstrip("#>*_ \t").strip()
+
+    def _flush(self) -> Dict[str, Any]:
+        item, self._current, self._field = self._current, {}, None
+        return item
+
+    def _consume_line(self, line: str) -> Optional[Dict[str, Any]]:
+        stripped = line.strip()
+        if stripped.startswith("---") or stripped.startswith("```"):
+            return self._flush()
+        line = self._clean(stripped)
+        if not line:
+            return None
+        if self.header_pattern.match(line):
+            return self._flush()
+        if not self._consume_field(line) and self._field:
+            self._append_continuation(line)
+        return None
+
+    @abstractmethod
+    def _consume_field(self, line: str) -> bool:
+        """Store `line` if it starts a field; False if it continues the last one."""
+        pass
+
+    def _append_continuation(self, line: str):
+        self._current[self._field] = f"{self._current[self._field]} {line}".strip()
+
+class FlashcardStreamParser(_StructuredStreamParser):
+    header_pattern = re.compile(r"^(CARD\b|Card\s*#?\d+)")
+    required_fields = ("question", "answer")
+
+    def _consume_field(self, line: str) -> bool:
+        match = re.match(r"^(Q|A)\d*\s*[:.]\s*(.*)$", line)
+        if not match:
+            return False
+        self._field = "question" if match.group(1) == "Q" else "answer"
+        self._current[self._field] = match.group(2).strip()
+        return True
+
+class QuizStreamParser(_StructuredStreamParser):
+    header_pattern = re.compile(r"^(QUESTION\b|Question\s*#?\d+)")
+    required_fields = ("question", "options", "correct_answer")
+
+    def _consume_field(self, line: str) -> bool:
+        option = re.match(r"^([A-D])[).]\s*(.*)$", line)
+        if option and "question" in self._current:
+            self._current.setdefault("options", []).append(f"{option.group(1)}) {option.group(2).strip()}")
+            self._field = "options"
+            return True
+        if line.startswith("Options:"):
+            self._field = None
+            return True
+        for prefix, field in (("Q:", "question"), ("Correct Answer:", "correct_answer"),
+                              ("Explanation:", "explanation")):
+            if line.startswith(prefix):
+                self._field = field
+                value = line[len(prefix):].strip()
+                self._current[field] = _answer_letter(value) if field == "correct_answer" else value
+                return True
+        return False
+
+    def _append_continuation(self, line: str):
+        if self._field == "options":
+            self._current["options"][-1] = f"{self._current['options'][-1]} {line}"
+        else:
+            super()._append_continuation(line)
+
+    def _normalize(self, obj: Dict[str, Any]) -> Dict[str, Any]:
+        options = obj.get("options") or []
+        if isinstance(options, dict):
+            options = [f"{k}) {v}" for k, v in options.items()]
+        labelled = []
+        for letter, option in zip("ABCD", options):
+            option = str(option).strip()
+            labelled.append(option if re.match(r"^[A-D]\)", option) else f"{letter}) {option}")
+        return {
+            "question": str(obj.get("question", "")).strip(),
+            "options": labelled,
+            "correct_answer": _answer_letter(str(obj.get("correct_answer", ""))),
+            "explanation": str(obj.get("explanation", "")).strip(),
+        }
+
+def _answer_letter(value: str) -> str:
+    match = re.match(r"^\(?([A-Da-d])\b", value.strip())
+    return match.group(1).upper() if match else value.strip()
+
+PARSERS = {"flashcards": FlashcardStreamParser, "quiz": QuizStreamParser}
+PROMPTS = {"flashcards": flashcard_prompt, "quiz": quiz_prompt}
+
+class ParseStats:
+    """Thread-safe counters for how well generations parse, per kind."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[str, int]] = {}
+
+    def _kind(self, kind: str) -> Dict[str, int]:
+        return self._counters.setdefault(kind, {
+            "responses": 0, "complete_responses": 0, "json_mode": 0, "line_mode": 0,
+            "items_expected": 0, "items_parsed": 0, "items_dropped": 0,
+            "repairs": 0, "items_repaired": 0,
+        })
+
+    def record_parse(self, kind: str, parser: _StructuredStreamParser, expected: int, parsed: int):
+        with self._lock:
+            counters = self._kind(kind)
+            counters["responses"] += 1
+            counters["complete_responses"] += parsed >= expected
+            counters["json_mode" if parser.mode == "json" else "line_mode"] += 1
+            counters["items_expected"] += expected
+            counters["items_parsed"] += parsed
+            counters["items_dropped"] += parser.dropped
+
+    def record_repair(self, kind: str, repaired: int):
+        with self._lock:
+            counters = self._kind(kind)
+            counters["repairs"] += 1
+            counters["items_repaired"] += repaired
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            stats = {}
+            for kind, counters in self._counters.items():
+                stats[kind] = {
+                    **counters,
+                    "response_success_rate": round(counters["complete_responses"] / counters["responses"], 3)
+                    if counters["responses"] else 0.0,
+                    "item_parse_rate": round(counters["items_parsed"] / counters["items_expected"], 3)
+                    if counters["items_expected"] else 0.0,
+                }
+            return stats
+
+parse_stats = ParseStats()
+
+def parse_items(kind: str, text: str, expected: int = 0) -> List[Dict[str, Any]]:
+    parser = PARSERS[kind]()
+    items = parser.feed(text) + parser.close()
+    parse_stats.record_parse(kind, parser, expected, len(items))
+    return items
+
+def parse_flashcards(text: str, expected: int = 0) -> List[Dict[str, str]]:
+    return parse_items("flashcards", text, expected)
+
+def parse_quiz(text: str, expected: int = 0) -> List[Dict[str, Any]]:
+    return parse_items("quiz", text, expected)
+
+def _merge(items: List[Dict[str, Any]], extra: List[Dict[str, Any]], missing: int) -> List[Dict[str, Any]]:
+    seen = {item["question"].strip().lower() for item in items}
+    new = [item for item in extra if item["question"].strip().lower() not in seen]
+    return items + new[:missing]
+
+def repair_missing(kind: str, topic: str, expected: int, items: List[Dict[str, Any]],
+                   generate: Callable[[str], str], max_attempts: int = 1) -> List[Dict[str, Any]]:
+    """Ask only for the items that did not parse instead of regenerating all of them."""
+    for _ in range(max_attempts):
+        missing = expected - len(items)
+        if missing <= 0:
+            break
+        extra = parse_items(kind, generate(repair_prompt(kind, topic, missing, items)), missing)
+        before = len(items)
+        items = _merge(items, extra, missing)
+        parse_stats.record_repair(kind, len(items) - before)
+    return items
+
+async def arepair_missing(kind: str, topic: str, expected: int, items: List[Dict[str, Any]],
+                          generate: Callable[[str], Awaitable[str]],
+                          max_attempts: int = 1) -> List[Dict[str, Any]]:
+    for _ in range(max_attempts):
+        missing = expected - len(items)
+        if missing <= 0:
+            break
+        extra = parse_items(kind, await generate(repair_prompt(kind, topic, missing, items)), missing)
+        before = len(items)
+        items = _merge(items, extra, missing)
+        parse_stats.record_repair(kind, len(items) - before)
+    return items
@@ -0,0 +1,68 @@
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import requests
+
+DEFAULT_MESSAGES = [
+    "python and machine learning",
+    "system design then c++",
+    "react and css also javascript",
+    "cloud deployment and node.js",
+    "data visualization",
+]
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the chatbot's /chat or /chat/batch endpoint.")
+    parser.add_argument("--url", default="http://localhost:5000")
+    parser.add_argument("--endpoint", choices=["chat", "chat/batch"], default="chat")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--batch-size", type=int, default=8, help="messages per /chat/batch request")
+    parser.add_argument("--messages-file", help="one message per line; defaults to a built-in set")
+    parser.add_argument("--timeout", type=float, default=300)
+    args = parser.parse_args()
+
+    if args.messages_file:
+        with open(args.messages_file, encoding="utf-8") as f:
+            messages = [line.strip() for line in f if line.strip()]
+    else:
+        messages = DEFAULT_MESSAGES
+
+    local = threading.local()
+    latencies, errors = [], []
+
+    def send(i):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        if args.endpoint == "chat":
+            body = {"message": messages[i % len(messages)]}
+        else:
+            body = {"messages": [messages[(i + j) % len(messages)] for j in range(args.batch_size)]}
+        start = time.perf_counter()
+        try:
+            response = session.post(f"{args.url}/{args.endpoint}", json=body, timeout=args.timeout)
+            if response.status_code != 200:
+                errors.append(response.status_code)
+                return
+        except requests.RequestException as e:
+            errors.append(type(e).__name__)
+            return
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(send, range(args.requests)))
+    elapsed = time.perf_counter() - start
+
+    print(f"{args.requests} requests to /{args.endpoint} at concurrency {args.concurrency} in {elapsed:.1f}s")
+    print(f"throughput: {len(latencies) / elapsed:.1f} req/s, errors: {len(errors)}"
+          + (f" ({', '.join(map(str, sorted(set(errors), key=str)))})" if errors else ""))
+    if latencies:
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        print(f"latency ms: p50 {p50:.1f}  p95 {p95:.1f}  p99 {p99:.1f}  max {max(latencies):.1f}")
+
+if __name__ == "__main__":
+    main()
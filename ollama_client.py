@@ -0,0 +1,52 @@
+import os
+from typing import Any, Dict, Optional
+import requests
+from requests.adapters import HTTPAdapter
+from rate_limit import ConcurrencyLimit
+
+class OllamaClient:
+    """Long-lived client for a local Ollama server.
+
+    One requests.Session keeps connections alive across calls, and the
+    adapter's pool holds one connection per allowed concurrent request.
+    At most `max_concurrency` generations run at once; the others wait,
+    for up to `timeout` seconds, for a slot.
+    """
+
+    def __init__(self, model: str = "llama2", base_url: str = "http://localhost:11434",
+                 max_concurrency: int = 4, timeout: float = 120.0):
+        self.model = model
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self._limit = ConcurrencyLimit(max_concurrency, timeout, name="Ollama",
+                                       timeout_errors=(TimeoutError, requests.Timeout))
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+    def generate(self, prompt: str, options: Optional[Dict[str, Any]] = None) -> str:
+        return self._limit.run(self._generate, prompt, options)
+
+    def _generate(self, prompt: str, options: Optional[Dict[str, Any]]) -> str:
+        response = self._session.post(
+            f"{self.base_url}/api/generate",
+            json={"model": self.model, "prompt": prompt, "stream": False, "options": options or {}},
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        return response.json().get("response", "")
+
+    def stats(self) -> Dict[str, Any]:
+        return self._limit.stats()
+
+    def close(self):
+        self._session.close()
+
+def client_from_env() -> OllamaClient:
+    return OllamaClient(
+        model=os.getenv("OLLAMA_MODEL", "llama2"),
+        base_url=os.getenv("OLLAMA_BASE_URL", "http://localhost:11434"),
+        max_concurrency=int(os.getenv("OLLAMA_MAX_CONCURRENCY", "4")),
+        timeout=float(os.getenv("OLLAMA_TIMEOUT", "120")),
+    )
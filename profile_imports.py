@@ -0,0 +1,59 @@
+import argparse
+import re
+import subprocess
+import sys
+import time
+
+# Each line of `python -X importtime` stderr looks like
+#   import time:   self [us] | cumulative | imported package
+_LINE = re.compile(r"^import time:\s+(\d+)\s*\|\s*(\d+)\s*\|(\s*)(\S+)")
+
+# Modules that must not be imported just because a service module was.
+HEAVY_MODULES = ("torch", "transformers", "google.generativeai")
+
+def profile_import(module: str):
+    """Import `module` in a fresh interpreter and return (wall_ms, {module: cumulative_ms})."""
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True,
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+    if proc.returncode != 0:
+        tail = "\n".join(proc.stderr.strip().splitlines()[-5:])
+        raise RuntimeError(f"import {module} failed:\n{tail}")
+
+    cumulative = {}
+    for line in proc.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            cumulative[match.group(4)] = int(match.group(2)) / 1000
+    return wall_ms, cumulative
+
+def main():
+    parser = argparse.ArgumentParser(description="Report import time of the service modules.")
+    parser.add_argument("modules", nargs="*", default=["QuestionsFlashcard_Generate", "quiz"])
+    parser.add_argument("--top", type=int, default=15, help="number of slowest imports to list")
+    parser.add_argument("--budget-ms", type=float, default=None,
+                        help="exit non-zero if any module takes longer than this to import")
+    args = parser.parse_args()
+
+    over_budget = []
+    for module in args.modules:
+        wall_ms, cumulative = profile_import(module)
+        import_ms = cumulative.get(module, 0.0)
+        print(f"\n{module}: {import_ms:8.1f} ms to import, {wall_ms:8.1f} ms wall (incl. interpreter start)")
+        for name, ms in sorted(cumulative.items(), key=lambda kv: kv[1], reverse=True)[:args.top]:
+            print(f"  {ms:8.1f} ms  {name}")
+        heavy = [name for name in HEAVY_MODULES if name in cumulative]
+        if heavy:
+            print(f"  warning: imported eagerly: {', '.join(heavy)}")
+        if args.budget_ms is not None and import_ms > args.budget_ms:
+            over_budget.append(module)
+
+    if over_budget:
+        print(f"\nOver the {args.budget_ms:.0f} ms budget: {', '.join(over_budget)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import numpy as np
+from langchain.embeddings.base import Embeddings
+
+def normalize_query(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip()
+
+def embedding_cache_name(embedding: Embeddings) -> str:
+    """Cache key prefix for `embedding`: its model name plus its backend, if it has one.
+
+    The int8 and fp32 backends of one model produce different vectors, so
+    they must not serve each other's entries.
+    """
+    name = getattr(embedding, "model_name", type(embedding).__name__)
+    backend = getattr(embedding, "backend", None)
+    return f"{name}@{backend}" if backend else name
+
+class QueryEmbeddingCache:
+    """Bounded LRU of query embeddings keyed on (model name, normalized text).
+
+    The model name is embedding_cache_name() for wrapped embeddings, so it
+    includes the inference backend.
+
+    Vectors are kept as float32 arrays. The cache can be saved to and loaded
+    from an .npz file so hot queries survive a restart.
+    """
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, model_name: str, text: str) -> Optional[np.ndarray]:
+        key = (model_name, normalize_query(text))
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is None:
+                self._counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+            return vector
+
+    def put(self, model_name: str, text: str, vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+        vector.setflags(write=False)
+        key = (model_name, normalize_query(text))
+        with self._lock:
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+        return vector
+
+    def get_or_compute(self, model_name: str, text: str, compute: Callable[[str], Any]) -> np.ndarray:
+        """Return the cached vector, or embed the normalized text with `compute` and cache it."""
+        vector = self.get(model_name, text)
+        if vector is None:
+            # Computed outside the lock; two threads missing on the same query
+            # both embed it, which is cheaper than serializing all misses.
+            vector = self.put(model_name, text, compute(normalize_query(text)))
+        return vector
+
+    def save(self, path: str) -> None:
+        with self._lock:
+            items = list(self._entries.items())
+        by_model: Dict[str, List[Tuple[str, np.ndarray]]] = {}
+        for (model_name, text), vector in items:
+            by_model.setdefault(model_name, []).append((text, vector))
+        arrays = {"models": np.array(list(by_model), dtype=str)}
+        for i, entries in enumerate(by_model.values()):
+            arrays[f"texts_{i}"] = np.array([text for text, _ in entries], dtype=str)
+            arrays[f"vectors_{i}"] = np.stack([vector for _, vector in entries])
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+    def load(self, path: str, model_names: Optional[set] = None) -> int:
+        """Add the entries saved at `path`, oldest first; returns how many were read.
+
+        With `model_names`, entries saved for other models (or backends) are skipped.
+        """
+        if not os.path.exists(path):
+            return 0
+        loaded = 0
+        with np.load(path) as data:
+            for i, model_name in enumerate(data["models"]):
+                if model_names is not None and str(model_name) not in model_names:
+                    continue
+                for text, vector in zip(data[f"texts_{i}"], data[f"vectors_{i}"]):
+                    self.put(str(model_name), str(text), vector)
+                    loaded += 1
+        return loaded
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                **self._counters,
+                "entries": len(self._entries),
+                "hit_rate": round(self._counters["hits"] / lookups, 3) if lookups else 0.0,
+            }
+
+# One cache for every retriever in the process; keys carry the model name
+# and backend, so wrappers around different embeddings can share it safely,
+# and a saved cache is never served to a different backend.
+query_embedding_cache = QueryEmbeddingCache()
+
+class CachedQueryEmbeddings(Embeddings):
+    """Embeddings wrapper that serves embed_query from a QueryEmbeddingCache.
+
+    Documents are passed straight through. Any other attribute is looked up
+    on the wrapped embeddings, so the wrapper can stand in for it.
+    """
+
+    def __init__(self, embedding: Embeddings, cache: Optional[QueryEmbeddingCache] = None):
+        self.embedding = embedding
+        self.cache = cache if cache is not None else query_embedding_cache
+        self.model_name = getattr(embedding, "model_name", type(embedding).__name__)
+        self.cache_name = embedding_cache_name(embedding)
+
+    def __getattr__(self, name: str):
+        # Only reached for attributes not set in __init__.
+        if "embedding" not in self.__dict__:
+            raise AttributeError(name)
+        return getattr(self.__dict__["embedding"], name)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embedding.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.cache.get_or_compute(self.cache_name, text, self.embedding.embed_query).tolist()
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.embedding.aembed_documents(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        vector = self.cache.get(self.cache_name, text)
+        if vector is None:
+            vector = self.cache.put(self.cache_name, text,
+                                    await self.embedding.aembed_query(normalize_query(text)))
+        return vector.tolist()
@@ -1,41 +1,15 @@
 from langchain.llms.base import LLM
 from typing import Any, List, Optional, Dict
 from pydantic import BaseModel, Field
+import threading
 import traceback
-from langchain.embeddings.base import Embeddings
-from langchain.vectorstores import FAISS
-from langchain.docstore.document import Document
 from langchain.chains import RetrievalQA
 from langchain.prompts import PromptTemplate
-import google.generativeai as genai
-import torch
-from transformers import AutoTokenizer, AutoModel
-import os
-import pickle
-
-class HFEmbeddingWrapper(Embeddings):
-    def __init__(self, model_name="distilbert-base-uncased"):
-        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-        self.model = AutoModel.from_pretrained(model_name)
-        
-    def embed_documents(self, texts: List[str]) -> List[List[float]]:
-        """Embed a list of documents."""
-        embeddings = []
-        for text in texts:
-            inputs = self.tokenizer(text, return_tensors="pt", truncation=True, padding=True, max_length=512)
-            with torch.no_grad():
-                outputs = self.model(**inputs)
-            embedding = outputs.last_hidden_state[:, 0, :].squeeze().numpy()
-            embeddings.append(embedding.tolist())
-        return embeddings
-    
-    def embed_query(self, text: str) -> List[float]:
-        """Embed a single query."""
-        inputs = self.tokenizer(text, return_tensors="pt", truncation=True, padding=True, max_length=512)
-        with torch.no_grad():
-            outputs = self.model(**inputs)
-        embedding = outputs.last_hidden_state[:, 0, :].squeeze().numpy()
-        return embedding.tolist()
+from hf_embeddings import HFEmbeddingWrapper, embed_sentences
+import faiss_store
+from curriculum import STUDY_TOPICS
+from retrieval import ThresholdMMRRetriever
+from learning_parsers import flashcard_prompt, quiz_prompt, parse_flashcards, parse_quiz, repair_missing
 
 documents = [
     "Machine learning is a branch of artificial intelligence that enables computers to learn from data and improve their performance on specific tasks without being explicitly programmed.",
@@ -51,21 +25,10 @@ documents = [
 ]
 
 embedding_model = HFEmbeddingWrapper()
-def load_or_create_faiss(documents, faiss_index_file):
-    '''if os.path.exists(faiss_index_file):
-        print("Loading existing FAISS index...")
-        with open(faiss_index_file, "rb") as f:
-            vectorstore = pickle.load(f)
-    else:'''
-    print("Creating new FAISS index...")
-    document_objects = [Document(page_content=doc) for doc in documents]
-    vectorstore = FAISS.from_documents(document_objects, embedding_model)
-    with open(faiss_index_file, "wb") as f:
-        pickle.dump(vectorstore, f)
-    return vectorstore
+def load_or_create_faiss(documents, faiss_index_dir):
+    return faiss_store.load_or_create(documents, faiss_index_dir, embedding_model)
 
-faiss_index_file = "offline_faiss_index.pkl"
-vectorstore = load_or_create_faiss(documents, faiss_index_file)
+faiss_index_dir = "offline_faiss_index"
 prompt_template = PromptTemplate(
     input_variables=["context", "question"],
     template="""Use the following context to answer the question. If you cannot answer based on the context, say "I don't have enough information."
@@ -85,7 +48,7 @@ class GeminiLLMWrapper(LLM, BaseModel):
     
     def _call(self, prompt: str, stop: Optional[List[str]] = None) -> str:
         try:
-            response = self.model.generate_content(prompt)
+            response = (self.model or get_gemini_model()).generate_content(prompt)
             if hasattr(response, 'text'):
                 return response.text
             elif hasattr(response, 'parts'):
@@ -103,38 +66,77 @@ class GeminiLLMWrapper(LLM, BaseModel):
     def _llm_type(self) -> str:
         return "gemini"
 
-genai.configure(api_key="") 
-gemini_model = genai.GenerativeModel("gemini-1.5-flash")
-llm_wrapper = GeminiLLMWrapper(model=gemini_model)
+# Nothing below is built at import time: the Gemini client, vectorstore and
+# QA chain are created on first use, or up front by warm_up().
+_gemini_model = None
+_gemini_lock = threading.Lock()
+vectorstore = None
+_vectorstore_lock = threading.Lock()
+qa_chain = None
+_qa_chain_lock = threading.Lock()
+
+def get_gemini_model():
+    global _gemini_model
+    if _gemini_model is None:
+        with _gemini_lock:
+            if _gemini_model is None:
+                import google.generativeai as genai
+                genai.configure(api_key="")
+                _gemini_model = genai.GenerativeModel("gemini-1.5-flash")
+    return _gemini_model
+
+llm_wrapper = GeminiLLMWrapper()
+
+def get_vectorstore():
+    global vectorstore
+    if vectorstore is None:
+        with _vectorstore_lock:
+            if vectorstore is None:
+                vectorstore = load_or_create_faiss(documents, faiss_index_dir)
+    return vectorstore
 
-qa_chain = RetrievalQA.from_chain_type(
-    llm=llm_wrapper,
-    chain_type="stuff",
-    retriever=vectorstore.as_retriever(
-        search_kwargs={
-            "k": 3, 
-            "fetch_k": 5,
-            "score_threshold": 0.5 
-        }
-    ),
-    return_source_documents=True,
-    chain_type_kwargs={
-        "prompt": PromptTemplate(
-            input_variables=["context", "question"],
-            template="""Use the following context to provide a comprehensive answer to the question. If the context doesn't contain enough information, you may use your general knowledge to supplement the answer, but indicate which parts are from the context and which are additional information.
+def get_qa_chain():
+    global qa_chain
+    if qa_chain is None:
+        with _qa_chain_lock:
+            if qa_chain is None:
+                qa_chain = RetrievalQA.from_chain_type(
+                    llm=llm_wrapper,
+                    chain_type="stuff",
+                    retriever=ThresholdMMRRetriever(
+                        vectorstore=get_vectorstore(),
+                        k=3,
+                        fetch_k=5,
+                        score_threshold=0.3,
+                        token_budget=1500,
+                        text_embedding=embed_sentences,
+                    ),
+                    return_source_documents=True,
+                    chain_type_kwargs={
+                        "prompt": PromptTemplate(
+                            input_variables=["context", "question"],
+                            template="""Use the following context to provide a comprehensive answer to the question. If the context doesn't contain enough information, you may use your general knowledge to supplement the answer, but indicate which parts are from the context and which are additional information.
 
 Context: {context}
 
 Question: {question}
 
 Answer (be specific and detailed):"""
-        )
-    }
-)
+                        )
+                    }
+                )
+    return qa_chain
+
+def warm_up():
+    """Create the embedding models, vectorstore, QA chain and Gemini client now."""
+    embedding_model.load()
+    embed_sentences(["warm up"])
+    get_qa_chain()
+    get_gemini_model()
 
 def ask_question(question: str):
     try:
-        result = qa_chain({"query": question})
+        result = get_qa_chain()({"query": question})
         answer = result.get("result", "No answer generated")
         sources = result.get("source_documents", [])
         
@@ -151,41 +153,14 @@ def ask_question(question: str):
     except Exception as e:
         return f"Error processing question: {str(e)}\nTrace: {traceback.format_exc()}"
 
+def _run_text(prompt: str) -> str:
+    return get_qa_chain()({"query": prompt}).get("result", "")
+
 def generate_flashcards(topic: str, num_cards: int = 5):
     """Generate flashcards based on the given topic using the FAISS index."""
     try:
-        flashcard_prompt = f"""Based on the available context, create {num_cards} detailed flashcards about {topic}.
-        For each flashcard:
-        1. Create a clear, specific question
-        2. Provide a comprehensive answer
-        3. Use the following format exactly:
-        CARD #number
-        Q: (question)
-        A: (detailed answer)
-        ---
-        """
-        
-        result = qa_chain({"query": flashcard_prompt})
-        cards_text = result.get("result", "")
-        
-        flashcards = []
-        current_card = {}
-        
-        for line in cards_text.split('\n'):
-            line = line.strip()
-            if line.startswith('CARD'):
-                if current_card:
-                    flashcards.append(current_card)
-                current_card = {}
-            elif line.startswith('Q:'):
-                current_card['question'] = line[2:].strip()
-            elif line.startswith('A:'):
-                current_card['answer'] = line[2:].strip()
-        
-        if current_card:
-            flashcards.append(current_card)
-            
-        return flashcards
+        flashcards = parse_flashcards(_run_text(flashcard_prompt(topic, num_cards)), num_cards)
+        return repair_missing("flashcards", topic, num_cards, flashcards, _run_text)
     except Exception as e:
         print(f"Error generating flashcards: {str(e)}")
         return []
@@ -193,49 +168,8 @@ def generate_flashcards(topic: str, num_cards: int = 5):
 def generate_quiz(topic: str, num_questions: int = 5):
     """Generate a multiple-choice quiz based on the given topic."""
     try:
-        quiz_prompt = f"""Create a {num_questions}-question multiple-choice quiz about {topic} using the following format:
-
-        QUESTION #number
-        Q: (detailed question)
-        Options:
-        A) (option 1)
-        B) (option 2)
-        C) (option 3)
-        D) (option 4)
-        Correct Answer: (letter)
-        Explanation: (why this is the correct answer)
-        ---
-
-        Make each question test understanding of {topic} concepts.
-        Ensure only one answer is correct.
-        Include brief explanations for the correct answers.
-        """
-        
-        result = qa_chain({"query": quiz_prompt})
-        quiz_text = result.get("result", "")
-        
-        quiz = []
-        current_question = {}
-        
-        for line in quiz_text.split('\n'):
-            line = line.strip()
-            if line.startswith('QUESTION'):
-                if current_question:
-                    quiz.append(current_question)
-                current_question = {'options': []}
-            elif line.startswith('Q:'):
-                current_question['question'] = line[2:].strip()
-            elif line.startswith(('A)', 'B)', 'C)', 'D)')):
-                current_question['options'].append(line)
-            elif line.startswith('Correct Answer:'):
-                current_question['correct_answer'] = line.replace('Correct Answer:', '').strip()
-            elif line.startswith('Explanation:'):
-                current_question['explanation'] = line.replace('Explanation:', '').strip()
-        
-        if current_question:
-            quiz.append(current_question)
-            
-        return quiz
+        quiz = parse_quiz(_run_text(quiz_prompt(topic, num_questions)), num_questions)
+        return repair_missing("quiz", topic, num_questions, quiz, _run_text)
     except Exception as e:
         print(f"Error generating quiz: {str(e)}")
         return []
@@ -282,14 +216,7 @@ if __name__ == "__main__":
 
 '''
 if __name__ == "__main__":
-    topics = [
-        "Machine Learning",
-        "Deep Learning",
-        "Neural Networks",
-        "Supervised Learning"
-    ]
-
-    for topic in topics:
+    for topic in STUDY_TOPICS:
         print(f"\n{'='*20} Studying {topic} {'='*20}")
         
         print(f"\nFlashcards for {topic}:")
@@ -0,0 +1,98 @@
+import asyncio
+import threading
+import time
+from typing import Any, Callable, Dict, Tuple, Type
+
+class RateLimiter:
+    """Token bucket allowing `rate` acquisitions per `per` seconds.
+
+    Up to `burst` acquisitions may happen back to back; after that callers
+    are spaced out evenly. Safe to share between threads.
+    """
+
+    def __init__(self, rate: float, per: float = 60.0, burst: int = 1):
+        self._fill_rate = rate / per
+        self._capacity = float(burst)
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _try_acquire(self) -> float:
+        """Take a token if one is available; otherwise return the wait in seconds."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._fill_rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self._fill_rate
+
+    def acquire(self) -> None:
+        while (wait := self._try_acquire()) > 0:
+            time.sleep(wait)
+
+    async def aacquire(self) -> None:
+        while (wait := self._try_acquire()) > 0:
+            await asyncio.sleep(wait)
+
+class ConcurrencyLimit:
+    """Caps how many calls run at once, with counters for /stats.
+
+    At most `max_concurrency` calls are in flight; the others wait, for up
+    to `timeout` seconds, for a slot and then raise TimeoutError. Exceptions
+    of the `timeout_errors` types raised by a call also count as timeouts.
+    Safe to share between threads.
+    """
+
+    def __init__(self, max_concurrency: int, timeout: float = 120.0, name: str = "call",
+                 timeout_errors: Tuple[Type[BaseException], ...] = (TimeoutError,)):
+        self.timeout = timeout
+        self.name = name
+        self.timeout_errors = timeout_errors
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._counters = {"calls": 0, "errors": 0, "timeouts": 0, "in_flight": 0, "wait_ms": 0.0, "call_ms": 0.0}
+
+    def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        start = time.perf_counter()
+        if not self._slots.acquire(timeout=self.timeout):
+            self._record(error=True, timeout=True)
+            raise TimeoutError(f"No {self.name} slot free after {self.timeout}s")
+        queued = time.perf_counter()
+        with self._lock:
+            self._counters["in_flight"] += 1
+        try:
+            result = fn(*args, **kwargs)
+        except self.timeout_errors:
+            self._record(error=True, timeout=True)
+            raise
+        except Exception:
+            self._record(error=True)
+            raise
+        finally:
+            with self._lock:
+                self._counters["in_flight"] -= 1
+            self._slots.release()
+        self._record(wait_ms=(queued - start) * 1000, call_ms=(time.perf_counter() - queued) * 1000)
+        return result
+
+    def _record(self, wait_ms: float = 0.0, call_ms: float = 0.0, error: bool = False, timeout: bool = False):
+        with self._lock:
+            self._counters["calls"] += 1
+            self._counters["errors"] += error
+            self._counters["timeouts"] += timeout
+            self._counters["wait_ms"] += wait_ms
+            self._counters["call_ms"] += call_ms
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            ok = self._counters["calls"] - self._counters["errors"]
+            return {
+                "calls": self._counters["calls"],
+                "errors": self._counters["errors"],
+                "timeouts": self._counters["timeouts"],
+                "in_flight": self._counters["in_flight"],
+                "avg_wait_ms": round(self._counters["wait_ms"] / ok, 1) if ok else 0.0,
+                "avg_call_ms": round(self._counters["call_ms"] / ok, 1) if ok else 0.0,
+            }
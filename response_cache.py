@@ -0,0 +1,97 @@
+import copy
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import numpy as np
+
+def normalize_topic(topic: str) -> str:
+    return re.sub(r"\s+", " ", topic).strip().lower()
+
+class ResponseCache:
+    """LRU + TTL cache for generated study material.
+
+    Entries are keyed on (kind, normalized topic, count, prompt version). On an
+    exact miss, a topic whose embedding has cosine similarity of at least
+    `similarity_threshold` with a cached topic of the same kind, count and
+    prompt version is served from that entry instead.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 3600,
+                 similarity_threshold: float = 0.95,
+                 embed_fn: Optional[Callable[[str], List[float]]] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.embed_fn = embed_fn
+        self._entries: "OrderedDict[Tuple, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "semantic_hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    def _embed(self, topic: str) -> Optional[np.ndarray]:
+        if self.embed_fn is None:
+            return None
+        vector = np.asarray(self.embed_fn(topic), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _expired(self, entry: Dict, now: float) -> bool:
+        return now - entry["created_at"] > self.ttl_seconds
+
+    def _purge_expired(self, now: float):
+        for key in [k for k, e in self._entries.items() if self._expired(e, now)]:
+            del self._entries[key]
+            self._counters["expirations"] += 1
+
+    def get(self, kind: str, topic: str, count: int, prompt_version: str) -> Optional[Any]:
+        key = (kind, normalize_topic(topic), count, prompt_version)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not self._expired(entry, now):
+                self._entries.move_to_end(key)
+                self._counters["hits"] += 1
+                return copy.deepcopy(entry["value"])
+            self._purge_expired(now)
+            candidates = [
+                (k, e) for k, e in self._entries.items()
+                if k[0] == kind and k[2] == count and k[3] == prompt_version and e["vector"] is not None
+            ]
+
+        if candidates and self.embed_fn is not None:
+            query = self._embed(key[1])
+            similarities = np.stack([e["vector"] for _, e in candidates]) @ query
+            best = int(np.argmax(similarities))
+            if similarities[best] >= self.similarity_threshold:
+                best_key, best_entry = candidates[best]
+                with self._lock:
+                    if best_key in self._entries:
+                        self._entries.move_to_end(best_key)
+                    self._counters["semantic_hits"] += 1
+                return copy.deepcopy(best_entry["value"])
+
+        with self._lock:
+            self._counters["misses"] += 1
+        return None
+
+    def put(self, kind: str, topic: str, count: int, prompt_version: str, value: Any) -> None:
+        normalized = normalize_topic(topic)
+        key = (kind, normalized, count, prompt_version)
+        vector = self._embed(normalized)
+        with self._lock:
+            self._entries[key] = {"value": copy.deepcopy(value), "vector": vector, "created_at": time.time()}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["semantic_hits"] + self._counters["misses"]
+            hits = self._counters["hits"] + self._counters["semantic_hits"]
+            return {
+                **self._counters,
+                "entries": len(self._entries),
+                "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            }
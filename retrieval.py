@@ -0,0 +1,252 @@
+import asyncio
+import logging
+import math
+import re
+import threading
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+import numpy as np
+from langchain.docstore.document import Document
+from langchain_community.vectorstores import FAISS
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.retrievers import BaseRetriever
+
+logger = logging.getLogger(__name__)
+
+def estimate_tokens(text: str) -> int:
+    # Roughly four characters per token for English text; good enough to
+    # compare prompt sizes without loading the LLM's tokenizer.
+    return math.ceil(len(text) / 4)
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+def mmr_select(query: np.ndarray, candidates: np.ndarray, k: int, lambda_mult: float = 0.5) -> List[int]:
+    """Maximal marginal relevance over unit vectors.
+
+    Keeps a running max-similarity-to-selected vector, so each step costs one
+    matrix-vector product instead of comparing every pair again.
+    """
+    if len(candidates) == 0:
+        return []
+    relevance = candidates @ query
+    pairwise = candidates @ candidates.T
+    selected = [int(np.argmax(relevance))]
+    redundancy = pairwise[selected[0]].copy()
+    available = np.ones(len(candidates), dtype=bool)
+    available[selected[0]] = False
+    while len(selected) < min(k, len(candidates)):
+        scores = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        np.maximum(redundancy, pairwise[best], out=redundancy)
+    return selected
+
+# Context packing. Chunks arrive most relevant first and are added until the
+# token budget is spent:
+#   * a chunk whose word 5-grams are mostly (>= overlap_threshold) already in
+#     the packed context is dropped as a duplicate;
+#   * a run of words shared with the start or end of a packed chunk, as left
+#     by overlapping text splitters, is trimmed off;
+#   * a chunk that does not fit is cut at a word boundary if at least
+#     MIN_TRUNCATED_TOKENS fit (or nothing is packed yet), otherwise skipped
+#     in favour of smaller ones.
+SHINGLE_SIZE = 5
+MIN_BOUNDARY_OVERLAP = 8
+MIN_TRUNCATED_TOKENS = 32
+
+def _word_spans(text: str) -> List[Tuple[int, int]]:
+    return [m.span() for m in re.finditer(r"\S+", text)]
+
+def _shingles(words: List[str]) -> Set[Tuple[str, ...]]:
+    if len(words) < SHINGLE_SIZE:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+def _boundary_overlap(left: List[str], right: List[str]) -> int:
+    """Length of the longest run of words that ends `left` and starts `right`."""
+    for n in range(min(len(left), len(right)) - 1, MIN_BOUNDARY_OVERLAP - 1, -1):
+        if left[-n:] == right[:n]:
+            return n
+    return 0
+
+def pack_context(docs: List[Document], token_budget: int,
+                 overlap_threshold: float = 0.8) -> Tuple[List[Document], Dict[str, int]]:
+    """Fit the most relevant documents into `token_budget` estimated tokens.
+
+    Returns the packed documents and a report with tokens_in, tokens_out,
+    duplicates, trimmed, truncated and skipped counts.
+    """
+    report = {"tokens_in": sum(estimate_tokens(d.page_content) for d in docs), "tokens_out": 0,
+              "duplicates": 0, "trimmed": 0, "truncated": 0, "skipped": 0}
+    packed: List[Document] = []
+    packed_words: List[List[str]] = []
+    seen: Set[Tuple[str, ...]] = set()
+    remaining = token_budget
+
+    for i, doc in enumerate(docs):
+        text = doc.page_content
+        spans = _word_spans(text)
+        words = [text[a:b] for a, b in spans]
+        shingles = _shingles(words)
+        if not shingles or len(shingles & seen) / len(shingles) >= overlap_threshold:
+            report["duplicates"] += 1
+            continue
+
+        start, end = 0, len(words)
+        for other in packed_words:
+            start = max(start, _boundary_overlap(other, words))
+            end = min(end, len(words) - _boundary_overlap(words, other))
+        if start >= end:
+            report["duplicates"] += 1
+            continue
+        if (start, end) != (0, len(words)):
+            report["trimmed"] += 1
+            text = text[spans[start][0]:spans[end - 1][1]]
+            words = words[start:end]
+
+        tokens = estimate_tokens(text)
+        if tokens > remaining:
+            if remaining < MIN_TRUNCATED_TOKENS and packed:
+                report["skipped"] += 1
+                continue
+            cut = max((b for _, b in _word_spans(text) if b <= remaining * 4), default=0)
+            if cut == 0:
+                # Not even the first word fits.
+                report["skipped"] += 1
+                continue
+            text = text[:cut]
+            words = text.split()
+            tokens = estimate_tokens(text)
+            report["truncated"] += 1
+
+        packed.append(Document(page_content=text, metadata=doc.metadata))
+        packed_words.append(words)
+        seen |= _shingles(words)
+        remaining -= tokens
+        report["tokens_out"] += tokens
+        if remaining <= 0:
+            report["skipped"] += len(docs) - i - 1
+            break
+    return packed, report
+
+class RetrievalStats:
+    """Thread-safe counters for what retrieval puts into prompts."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {"queries": 0, "candidates": 0, "below_threshold": 0, "returned": 0,
+                          "empty_results": 0, "context_tokens": 0,
+                          "packed": 0, "tokens_before_packing": 0, "tokens_saved": 0,
+                          "duplicates_dropped": 0, "truncated": 0}
+
+    def record(self, candidates: int, below_threshold: int, docs: List[Document]):
+        with self._lock:
+            self._counters["queries"] += 1
+            self._counters["candidates"] += candidates
+            self._counters["below_threshold"] += below_threshold
+            self._counters["returned"] += len(docs)
+            self._counters["empty_results"] += not docs
+            self._counters["context_tokens"] += sum(estimate_tokens(d.page_content) for d in docs)
+
+    def record_packing(self, report: Dict[str, int]):
+        with self._lock:
+            self._counters["packed"] += 1
+            self._counters["tokens_before_packing"] += report["tokens_in"]
+            self._counters["tokens_saved"] += report["tokens_in"] - report["tokens_out"]
+            self._counters["duplicates_dropped"] += report["duplicates"]
+            self._counters["truncated"] += report["truncated"]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            queries = self._counters["queries"]
+            return {
+                **self._counters,
+                "avg_docs": round(self._counters["returned"] / queries, 2) if queries else 0.0,
+                "avg_context_tokens": round(self._counters["context_tokens"] / queries, 1) if queries else 0.0,
+            }
+
+retrieval_stats = RetrievalStats()
+
+def packed_context(docs: List[Document], token_budget: int) -> List[Document]:
+    """pack_context, recording the tokens it saved in retrieval_stats."""
+    packed, report = pack_context(docs, token_budget)
+    retrieval_stats.record_packing(report)
+    if report["tokens_in"] > report["tokens_out"]:
+        logger.info(f"context packed: {report['tokens_in']} -> {report['tokens_out']} tokens "
+                    f"({report['duplicates']} duplicate, {report['trimmed']} trimmed, "
+                    f"{report['truncated']} truncated, {report['skipped']} skipped)")
+    return packed
+
+class ThresholdMMRRetriever(BaseRetriever):
+    """Retriever that honors fetch_k and score_threshold.
+
+    Fetches `fetch_k` nearest neighbours from the FAISS index, drops those
+    whose cosine similarity to the query is below `score_threshold`, and
+    picks up to `k` of the rest by MMR. Each returned document carries its
+    similarity in metadata["score"]. With a `token_budget`, the picks are
+    then packed into that many estimated tokens with pack_context.
+
+    With `text_embedding`, a function returning unit vectors for a list of
+    texts, the query and the fetched chunks are scored and diversified with
+    that model instead of the index's own vectors; the threshold must then
+    be calibrated for it.
+    """
+
+    vectorstore: FAISS
+    k: int = 3
+    fetch_k: int = 5
+    score_threshold: float = 0.5
+    lambda_mult: float = 0.5
+    token_budget: Optional[int] = None
+    text_embedding: Optional[Callable[[List[str]], np.ndarray]] = None
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    def _select(self, query_text: str, query_vector: List[float]) -> List[Document]:
+        index = self.vectorstore.index
+        vector = np.asarray(query_vector, dtype=np.float32)[None, :]
+        _, ids = index.search(vector, min(self.fetch_k, index.ntotal))
+        ids = [int(i) for i in ids[0] if i != -1]
+        if not ids:
+            retrieval_stats.record(0, 0, [])
+            return []
+
+        fetched = [self.vectorstore.docstore.search(self.vectorstore.index_to_docstore_id[i]) for i in ids]
+        if self.text_embedding is not None:
+            vectors = np.asarray(self.text_embedding([query_text] + [d.page_content for d in fetched]),
+                                 dtype=np.float32)
+            query, candidates = vectors[0], vectors[1:]
+        else:
+            query = _normalize_rows(vector[0])
+            candidates = _normalize_rows(np.vstack([index.reconstruct(i) for i in ids]))
+        scores = candidates @ query
+        keep = np.flatnonzero(scores >= self.score_threshold)
+        chosen = [keep[j] for j in mmr_select(query, candidates[keep], self.k, self.lambda_mult)]
+
+        docs = [
+            Document(page_content=fetched[j].page_content,
+                     metadata={**fetched[j].metadata, "score": float(scores[j])})
+            for j in chosen
+        ]
+        if self.token_budget is not None:
+            docs = packed_context(docs, self.token_budget)
+        retrieval_stats.record(len(ids), len(ids) - len(keep), docs)
+        return docs
+
+    def _get_relevant_documents(self, query: str, *,
+                                run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        return self._select(query, self.vectorstore.embedding_function.embed_query(query))
+
+    async def _aget_relevant_documents(self, query: str, *,
+                                       run_manager: AsyncCallbackManagerForRetrieverRun) -> List[Document]:
+        embedding = self.vectorstore.embedding_function
+        vector = await embedding.aembed_query(query)
+        # The FAISS search, reconstructs and MMR are CPU work; keep them off
+        # the event loop, on the embeddings' executor when they have one.
+        return await asyncio.get_running_loop().run_in_executor(
+            getattr(embedding, "executor", None), self._select, query, vector
+        )
@@ -1,14 +1,14 @@
 from fastapi import FastAPI
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
-from langchain_community.vectorstores import FAISS
-from langchain.docstore.document import Document
 from langchain.chains import RetrievalQA
 from langchain.prompts import PromptTemplate
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_huggingface import HuggingFaceEmbeddings
-import pickle
 import os
+import faiss_store
+from query_cache import CachedQueryEmbeddings
+from curriculum import SKILL_HIERARCHY
 from dotenv import load_dotenv
 load_dotenv()
 app = FastAPI()
@@ -32,30 +32,14 @@ class RoadmapRequest(BaseModel):
     experience: str
 
 class RoadMap:
-    def __init__(self, google_api_key: str, faiss_index: str = "roadmap_faiss_index.pkl"):
+    def __init__(self, google_api_key: str, faiss_index: str = "roadmap_faiss_index"):
         self.faiss_index = faiss_index
         self.llm = llm
-        self.embedding_model = HuggingFaceEmbeddings(
+        self.embedding_model = CachedQueryEmbeddings(HuggingFaceEmbeddings(
             model_name="sentence-transformers/all-MiniLM-L6-v2"
-        )
+        ))
         self.vectorstore = self.load_or_create_faiss()
-        self.skill_hierarchy = {
-            "foundational": {
-                "programming": ["Python", "R", "SQL"],
-                "mathematics": ["Statistics", "Linear Algebra", "Calculus"],
-                "tools": ["Git", "Command Line"]
-            },
-            "intermediate": {
-                "data_processing": ["Pandas", "NumPy", "Data Cleaning"],
-                "visualization": ["Matplotlib", "Seaborn", "Tableau"],
-                "ml_basics": ["Scikit-learn", "Model Evaluation", "Feature Engineering"]
-            },
-            "advanced": {
-                "deep_learning": ["Neural Networks", "TensorFlow", "PyTorch"],
-                "big_data": ["Spark", "Hadoop", "Cloud Computing"],
-                "deployment": ["MLOps", "Docker", "API Development"]
-            }
-        }
+        self.skill_hierarchy = SKILL_HIERARCHY
 
     def load_or_create_faiss(self):
         documents = [
@@ -69,17 +53,7 @@ class RoadMap:
             "Learn deployment technologies after gaining solid modeling experience."
         ]
 
-        if os.path.exists(self.faiss_index):
-            print("Loading Faiss Index")
-            with open(self.faiss_index, "rb") as f:
-                return pickle.load(f)
-        else:
-            print("Creating Faiss Index")
-            document_object = [Document(page_content=doc) for doc in documents]
-            vectorstore = FAISS.from_documents(document_object, self.embedding_model)
-            with open(self.faiss_index, "wb") as f:
-                pickle.dump(vectorstore, f)
-            return vectorstore
+        return faiss_store.load_or_create(documents, self.faiss_index, self.embedding_model)
 
     def determine_skill_level(self, capabilities: str) -> str:
         """Determine the starting skill level based on user capabilities."""
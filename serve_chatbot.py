@@ -0,0 +1,55 @@
+import argparse
+import multiprocessing
+import os
+from gunicorn.app.base import BaseApplication
+
+# Production server for chatbot.py: a pre-forked gunicorn with threaded
+# workers. The app is imported once in the master (preload), so the encoder
+# weights are shared copy-on-write by every worker and the FAISS index,
+# loaded memory-mapped from CHATBOT_INDEX_DIR, is shared through the page
+# cache. Threads let a worker keep serving while other requests wait on the
+# LLM; the Ollama client still caps how many generations run at once.
+
+def post_fork(server, worker):
+    # One intra-op thread per worker; N workers each using every core for
+    # a small query encode just contend with each other.
+    import torch
+    torch.set_num_threads(int(os.getenv("TORCH_THREADS_PER_WORKER", "1")))
+
+class ChatbotServer(BaseApplication):
+    def __init__(self, options):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from chatbot import app
+        return app
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the chatbot with pre-forked gunicorn workers.")
+    parser.add_argument("--bind", default=os.getenv("CHATBOT_BIND", "0.0.0.0:5000"))
+    parser.add_argument("--workers", type=int,
+                        default=int(os.getenv("CHATBOT_WORKERS", str(min(4, multiprocessing.cpu_count())))))
+    parser.add_argument("--threads", type=int, default=int(os.getenv("CHATBOT_THREADS", "8")),
+                        help="request threads per worker")
+    parser.add_argument("--timeout", type=int, default=int(os.getenv("CHATBOT_TIMEOUT", "180")),
+                        help="seconds before a stuck worker is restarted")
+    args = parser.parse_args()
+
+    ChatbotServer({
+        "bind": args.bind,
+        "workers": args.workers,
+        "threads": args.threads,
+        "worker_class": "gthread",
+        "preload_app": True,
+        "timeout": args.timeout,
+        "keepalive": 5,
+        "post_fork": post_fork,
+    }).run()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+import argparse
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional
+from response_cache import normalize_topic
+from rate_limit import RateLimiter
+from curriculum import curriculum_topics
+
+class StudyBank:
+    """SQLite store of pre-generated flashcards and quizzes.
+
+    One entry per (kind, topic, prompt version). An entry generated with N
+    items serves any request for up to N items. A connection is opened per
+    call, so the bank can be shared by threads and worker processes.
+    """
+
+    def __init__(self, path: str = "study_bank.sqlite3"):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS bank (
+                    kind TEXT NOT NULL,
+                    topic TEXT NOT NULL,
+                    prompt_version TEXT NOT NULL,
+                    count INTEGER NOT NULL,
+                    items TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (kind, topic, prompt_version)
+                )
+            """)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get(self, kind: str, topic: str, count: int, prompt_version: str) -> Optional[Dict[str, Any]]:
+        """Return the first `count` items, the entry's size and its age in
+        seconds, or None if the bank holds fewer than `count` items."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT count, items, created_at FROM bank WHERE kind = ? AND topic = ? AND prompt_version = ?",
+                (kind, normalize_topic(topic), prompt_version),
+            ).fetchone()
+        if row is None or row[0] < count:
+            return None
+        return {"items": json.loads(row[1])[:count], "count": row[0], "age": time.time() - row[2]}
+
+    def put(self, kind: str, topic: str, prompt_version: str, items: List[Dict[str, Any]]) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO bank (kind, topic, prompt_version, count, items, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (kind, normalize_topic(topic), prompt_version, len(items), json.dumps(items), time.time()),
+            )
+
+    def is_fresh(self, kind: str, topic: str, count: int, prompt_version: str, max_age: float) -> bool:
+        entry = self.get(kind, topic, count, prompt_version)
+        return entry is not None and entry["age"] <= max_age
+
+def build_bank(bank: StudyBank, generators: Dict[str, Callable[[str, int], List[Dict[str, Any]]]],
+               topics: List[str], counts: Dict[str, int], prompt_versions: Dict[str, str],
+               max_age: float, max_workers: int = 4, per_minute: float = 30) -> Dict[str, int]:
+    """Generate every missing or stale (kind, topic) entry on a thread pool.
+
+    Each entry is committed as soon as it is generated, so an interrupted run
+    picks up where it stopped. `per_minute` caps how many generations start
+    per minute across all workers.
+    """
+    tasks = [
+        (kind, topic) for topic in topics for kind in generators
+        if not bank.is_fresh(kind, topic, counts[kind], prompt_versions[kind], max_age)
+    ]
+    summary = {"skipped": len(topics) * len(generators) - len(tasks), "generated": 0, "failed": 0}
+    print(f"{len(tasks)} bank entries to generate, {summary['skipped']} already fresh")
+    limiter = RateLimiter(per_minute)
+
+    def generate(kind: str, topic: str) -> int:
+        limiter.acquire()
+        items = generators[kind](topic, counts[kind])
+        if len(items) < counts[kind]:
+            raise ValueError(f"only {len(items)} of {counts[kind]} items generated")
+        bank.put(kind, topic, prompt_versions[kind], items)
+        return len(items)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(generate, kind, topic): (kind, topic) for kind, topic in tasks}
+        for done, future in enumerate(as_completed(futures), 1):
+            kind, topic = futures[future]
+            try:
+                num_items = future.result()
+                summary["generated"] += 1
+                status = f"{num_items} items"
+            except Exception as e:
+                summary["failed"] += 1
+                status = f"failed: {e}"
+            print(f"[{done}/{len(tasks)}] {kind} '{topic}': {status} ({time.perf_counter() - start:.1f}s)")
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-generate flashcards and quizzes for the curriculum.")
+    parser.add_argument("--db", default=os.getenv("STUDY_BANK_PATH", "study_bank.sqlite3"))
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--per-minute", type=float, default=30, help="max generations started per minute")
+    parser.add_argument("--num-cards", type=int, default=10)
+    parser.add_argument("--num-questions", type=int, default=5)
+    parser.add_argument("--max-age-hours", type=float, default=float(os.getenv("STUDY_BANK_MAX_AGE_HOURS", "168")))
+    args = parser.parse_args()
+
+    # Imported here so the store above stays usable without loading the models.
+    import QuestionsFlashcard_Generate as service
+
+    # Generate fresh for every entry: the response cache could answer one
+    # topic with a neighbouring topic's material, which the bank would keep.
+    generators = {
+        "flashcards": lambda topic, count: service.generate_flashcards(topic, count, use_cache=False),
+        "quiz": lambda topic, count: service.generate_quiz(topic, count, use_cache=False),
+    }
+
+    summary = build_bank(
+        StudyBank(args.db),
+        generators=generators,
+        topics=curriculum_topics(),
+        counts={"flashcards": args.num_cards, "quiz": args.num_questions},
+        prompt_versions=service.PROMPT_VERSIONS,
+        max_age=args.max_age_hours * 3600,
+        max_workers=args.workers,
+        per_minute=args.per_minute,
+    )
+    print(f"Done: {summary}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+import re
+import threading
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+
+# Topic names shorter than this are not matched as keywords: "r" or "c"
+# would otherwise tag "R&D" or "plan c." Such topics match through their
+# aliases, or through embedding similarity like any other topic.
+MIN_KEYWORD_LENGTH = 3
+KEYWORD_ALIASES = {
+    "r": ("r language", "r programming", "rstats", "rstudio", "tidyverse", "ggplot2"),
+    "c": ("c language", "c programming", "ansi c", "c99", "c11"),
+    "go": ("golang", "go language", "go programming"),
+}
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+def _keywords(topic: str) -> List[str]:
+    keywords = list(KEYWORD_ALIASES.get(topic, ()))
+    if len(topic) >= MIN_KEYWORD_LENGTH:
+        keywords.append(topic)
+    return keywords
+
+class TopicTagger:
+    """Tags text with topics from a fixed vocabulary, without calling an LLM.
+
+    A topic is assigned when its name (for very short names, one of its
+    KEYWORD_ALIASES) appears in the text, or when its sentence embedding is
+    among the `top_k` most similar to the text's with cosine similarity of
+    at least `min_similarity`. Results are memoized per
+    normalized text, so asking about the same question again is a dict lookup.
+
+    `overlay()` returns a tagger that adds topics on top of this one, reusing
+    its encoder and topic vectors without modifying it.
+    """
+
+    def __init__(self, vocabulary: Iterable[str], model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
+                 top_k: int = 3, min_similarity: float = 0.35, encoder=None,
+                 base: Optional["TopicTagger"] = None):
+        self.model_name = model_name
+        self.top_k = top_k
+        self.min_similarity = min_similarity
+        self._encoder = encoder
+        self._base = base
+        self._lock = threading.Lock()
+        self._topics: List[str] = []
+        self._topic_vectors: Optional[np.ndarray] = None
+        self._memo: Dict[str, List[str]] = {}
+        self._counters = {"lookups": 0, "memo_hits": 0, "encoded": 0}
+        self.add_topics(vocabulary)
+
+    def overlay(self, topics: Iterable[str] = ()) -> "TopicTagger":
+        """A tagger with this vocabulary plus `topics`, e.g. one candidate's skills."""
+        return TopicTagger(topics, self.model_name, self.top_k, self.min_similarity, base=self)
+
+    @property
+    def encoder(self):
+        if self._base is not None:
+            return self._base.encoder
+        if self._encoder is None:
+            with self._lock:
+                if self._encoder is None:
+                    from sentence_transformers import SentenceTransformer
+                    self._encoder = SentenceTransformer(self.model_name)
+        return self._encoder
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        return self.encoder.encode(texts, convert_to_numpy=True, normalize_embeddings=True).astype(np.float32)
+
+    def add_topics(self, topics: Iterable[str]) -> None:
+        """Extend the vocabulary, e.g. with a candidate's own skills."""
+        with self._lock:
+            known = set(self._topics)
+        if self._base is not None:
+            with self._base._lock:
+                known.update(self._base._topics)
+        new = list(dict.fromkeys(t for t in (_normalize(t) for t in topics) if t and t not in known))
+        if not new:
+            return
+        # Vectors are computed on first tag so building a tagger stays cheap.
+        with self._lock:
+            self._topics.extend(new)
+            self._topic_vectors = None
+            # Earlier results could have matched one of the new topics.
+            self._memo.clear()
+
+    def _vectors(self) -> np.ndarray:
+        vectors = self._topic_vectors
+        if vectors is None:
+            with self._lock:
+                topics = list(self._topics)
+            vectors = self._encode(topics)
+            with self._lock:
+                if len(topics) == len(self._topics):
+                    self._topic_vectors = vectors
+        return vectors
+
+    def _vocabulary(self):
+        """Topics and their vectors, the base tagger's first."""
+        vectors = self._vectors()
+        with self._lock:
+            topics = self._topics[:len(vectors)]
+        if self._base is not None:
+            base_topics, base_vectors = self._base._vocabulary()
+            topics = base_topics + topics
+            vectors = np.vstack([base_vectors, vectors])
+        return topics, vectors
+
+    def _match(self, text: str, vector: np.ndarray, topics: List[str], vectors: np.ndarray) -> List[str]:
+        found = [
+            t for t in topics
+            if any(re.search(rf"(?<!\w){re.escape(k)}(?!\w)", text) for k in _keywords(t))
+        ]
+        similarities = vectors @ vector
+        for i in np.argsort(-similarities)[:self.top_k]:
+            if similarities[i] >= self.min_similarity and topics[i] not in found:
+                found.append(topics[i])
+        return found
+
+    def tag_many(self, texts: List[str]) -> List[List[str]]:
+        """Tag several texts, embedding all that are not memoized in one batch."""
+        keys = [_normalize(t) for t in texts]
+        tagged: Dict[str, List[str]] = {}
+        with self._lock:
+            self._counters["lookups"] += len(keys)
+            self._counters["memo_hits"] += sum(1 for k in keys if k in self._memo)
+            missing = list(dict.fromkeys(k for k in keys if k not in self._memo))
+        if missing and self._base is not None and not self._topics:
+            # Nothing added on top: the base tagger's memo answers for us.
+            tagged = dict(zip(missing, self._base.tag_many(missing)))
+            with self._lock:
+                self._memo.update(tagged)
+        elif missing:
+            topics, vectors = self._vocabulary()
+            tagged = {
+                key: self._match(key, vector, topics, vectors)
+                for key, vector in zip(missing, self._encode(missing))
+            }
+            with self._lock:
+                self._memo.update(tagged)
+                self._counters["encoded"] += len(missing)
+        with self._lock:
+            return [list(self._memo[k] if k in self._memo else tagged[k]) for k in keys]
+
+    def tag(self, text: str) -> List[str]:
+        return self.tag_many([text])[0]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._counters, "topics": len(self._topics), "memoized": len(self._memo)}